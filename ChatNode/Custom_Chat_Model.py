@@ -1,5 +1,10 @@
-from typing import List, Optional, Iterator
+from typing import Any, AsyncIterator, Dict, List, Optional, Iterator
+import asyncio
+import threading
+import weakref
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import (
@@ -10,7 +15,9 @@ from langchain_core.messages import (
     AIMessageChunk
 )
 from langchain_core.outputs import ChatGeneration, ChatResult, ChatGenerationChunk
-import json
+from pydantic import PrivateAttr
+from singleflight import SingleFlight, flight_key
+from sse import astream_text, stream_text
 
 
 class EuriChatModel(BaseChatModel):
@@ -24,10 +31,122 @@ class EuriChatModel(BaseChatModel):
     max_tokens: int = 1000
     base_url: str = "https://api.euron.one/api/v1/euri/chat/completions"
 
+    # HTTP connection pool, shared by every call (and thread) on this model
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    pool_maxsize: int = 10
+    # Async calls multiplex many streams on one event loop, so allow more
+    async_pool_maxsize: int = 200
+    coalesce_requests: bool = True
+
+    _session: Optional[requests.Session] = PrivateAttr(default=None)
+    _session_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _async_clients: weakref.WeakKeyDictionary = PrivateAttr(
+        default_factory=weakref.WeakKeyDictionary
+    )
+    _flights: SingleFlight = PrivateAttr(default_factory=SingleFlight)
+
     @property
     def _llm_type(self) -> str:
         return "euri-chat"
 
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # Part of LangChain's llm_string, so response caches key on them.
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "base_url": self.base_url,
+        }
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Keep-alive session, created on first use, so turns after the first
+        reuse an open TLS connection to the API. At most `pool_maxsize`
+        connections are open; further requests wait for a free one.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_maxsize,
+                        pool_block=True,
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update(
+                        {
+                            "Content-Type": "application/json",
+                            "Authorization": f"Bearer {self.api_key}",
+                        }
+                    )
+                    self._session = session
+        return self._session
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Keep-alive async client for the running event loop. httpx connections
+        belong to the loop that opened them, so there is one pooled client
+        per loop, shared by every coroutine on it.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.async_pool_maxsize,
+                    max_keepalive_connections=self.async_pool_maxsize,
+                ),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def pool_stats(self) -> dict:
+        """
+        Requests sent and connections opened by the session so far; a
+        `reuse_rate` near 1 means almost every request skipped the handshake.
+        """
+        requests_sent = connections = 0
+        if self._session is not None:
+            adapter = self._session.get_adapter(self.base_url)
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        reuse_rate = 1 - connections / requests_sent if requests_sent else 0.0
+        return {
+            "requests": requests_sent,
+            "connections": connections,
+            "reuse_rate": reuse_rate,
+        }
+
+    def coalesce_stats(self) -> dict:
+        """Calls made and how many of them joined an identical in-flight request."""
+        return self._flights.stats()
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
     def _convert_messages_to_euri(
         self, messages: List[BaseMessage]
     ) -> List[dict]:
@@ -72,29 +191,19 @@ class EuriChatModel(BaseChatModel):
 
         return euri_messages
 
-    def _generate(self, messages, stop=None, **kwargs):
+    def _payload(self, messages: List[BaseMessage], stream: bool = False) -> dict:
         payload = {
             "model": self.model,
             "messages": self._convert_messages_to_euri(messages),
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
         }
+        if stream:
+            payload["stream"] = True
+        return payload
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
-
-        response = requests.post(
-            self.base_url,
-            json=payload,
-            headers=headers,
-            timeout=60,
-        )
-        
-        response.raise_for_status()
-        data = response.json()
-
+    @staticmethod
+    def _chat_result(data: dict) -> ChatResult:
         message_content = data["choices"][0]["message"]["content"]
 
         # Handle both response formats
@@ -107,64 +216,104 @@ class EuriChatModel(BaseChatModel):
         generation = ChatGeneration(message=ai_message)
 
         return ChatResult(generations=[generation])
-    
-    def _stream(
-        self,
-        messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        **kwargs,
-    ):
-        payload = {
-            "model": self.model,
-            "messages": self._convert_messages_to_euri(messages),
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
-            "stream": True,
-        }
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
+    def _coalesce_key(self, payload: dict) -> Optional[str]:
+        return flight_key(self.base_url, payload) if self.coalesce_requests else None
 
-        with requests.post(
+    def _post_json(self, payload: dict) -> dict:
+        response = self.session.post(
+            self.base_url,
+            json=payload,
+            timeout=(self.connect_timeout, self.read_timeout),
+        )
+
+        response.raise_for_status()
+        return response.json()
+
+    def _post_stream(self, payload: dict) -> Iterator[ChatGenerationChunk]:
+        with self.session.post(
             self.base_url,
             json=payload,
-            headers=headers,
             stream=True,
-            timeout=60,
+            timeout=(self.connect_timeout, self.read_timeout),
         ) as response:
             response.raise_for_status()
-            
-            for line in response.iter_lines(decode_unicode=True):
-                if not line:
-                    continue
-                
-                # Handle SSE format
-                if line.startswith("data:"):
-                    line = line[len("data:"):].strip()
-
-                if line == "[DONE]":
-                    break
-
-                try:
-                    chunk = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                choices = chunk.get("choices")
-                if not choices:
-                    continue  
-
-                delta = choices[0].get("delta", {})
-                content = delta.get("content")
-
-                if not content:
-                    continue
-
-                yield ChatGenerationChunk(
-                    message=AIMessageChunk(content=content)
-                )
+
+            # read1 returns whatever has arrived (up to 8 KiB) instead of
+            # waiting for a full buffer; iter_content(chunk_size=None) only
+            # does that for chunked bodies and reads the whole body otherwise.
+            chunks = iter(lambda: response.raw.read1(8192, decode_content=True), b"")
+            for content in stream_text(chunks):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+    async def _apost_json(self, payload: dict) -> dict:
+        response = await self.async_client.post(
+            self.base_url,
+            json=payload,
+        )
+
+        response.raise_for_status()
+        return response.json()
+
+    async def _apost_stream(self, payload: dict) -> AsyncIterator[ChatGenerationChunk]:
+        async with self.async_client.stream(
+            "POST",
+            self.base_url,
+            json=payload,
+        ) as response:
+            response.raise_for_status()
+
+            async for content in astream_text(response.aiter_bytes()):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+    # Identical requests already in flight are joined rather than resent
+    # (see singleflight.py); coalesce_requests=False turns this off.
+
+    def _generate(self, messages, stop=None, **kwargs):
+        payload = self._payload(messages)
+        key = self._coalesce_key(payload)
+        if key is None:
+            data = self._post_json(payload)
+        else:
+            data = self._flights.do(key, lambda: self._post_json(payload))
+        return self._chat_result(data)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Iterator[ChatGenerationChunk]:
+        payload = self._payload(messages, stream=True)
+        key = self._coalesce_key(payload)
+        if key is None:
+            yield from self._post_stream(payload)
+        else:
+            yield from self._flights.stream(key, lambda: self._post_stream(payload))
+
+    async def _agenerate(self, messages, stop=None, **kwargs):
+        payload = self._payload(messages)
+        key = self._coalesce_key(payload)
+        if key is None:
+            data = await self._apost_json(payload)
+        else:
+            data = await self._flights.ado(key, lambda: self._apost_json(payload))
+        return self._chat_result(data)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        payload = self._payload(messages, stream=True)
+        key = self._coalesce_key(payload)
+        if key is None:
+            chunks = self._apost_stream(payload)
+        else:
+            chunks = self._flights.astream(key, lambda: self._apost_stream(payload))
+        async for chunk in chunks:
+            yield chunk
 
 
 # from dotenv import load_dotenv
@@ -3,7 +3,9 @@ from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 from Custom_Chat_Model import EuriChatModel
+from llm_cache import response_cache_from_env
 from typing import TypedDict, Annotated
+from conversation import DEFAULT_PAGE_SIZE, load_message_page
 from dotenv import load_dotenv
 import os
 
@@ -11,9 +13,11 @@ load_dotenv()
 
 EURI_API = os.getenv("EURI_API_KEY")
 
+# Responses are cached only when LLM_CACHE_PATH is set
 llm = EuriChatModel(
     model='gpt-4.1-mini',
-    api_key=EURI_API
+    api_key=EURI_API,
+    cache=response_cache_from_env()
     )
 
 # State 
@@ -41,4 +45,8 @@ graph.add_edge(START,'chat_node')
 graph.add_edge('chat_node',END)
 
 # Compile graph
-chatbot = graph.compile(checkpointer=checkpointer)
\ No newline at end of file
+chatbot = graph.compile(checkpointer=checkpointer)
+
+def load_messages(thread_id, limit=DEFAULT_PAGE_SIZE, before=None):
+    """Last `limit` messages before the `before` cursor, and the cursor for the page before them."""
+    return load_message_page(chatbot, thread_id, limit, before)
\ No newline at end of file
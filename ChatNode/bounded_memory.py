@@ -0,0 +1,250 @@
+"""
+In-memory checkpointer with a memory cap.
+
+`InMemorySaver` keeps every checkpoint of every thread for the life of the
+process. `BoundedMemorySaver` keeps the same in-memory layout but tracks the
+serialized size of each thread and, once the total goes over `max_bytes`,
+evicts the least recently used threads. With a `spill_path` evicted threads
+are moved to a local SQLite file instead of being dropped, and are loaded
+back the next time they are read or written:
+
+    memory = BoundedMemorySaver(max_bytes=64 * 1024 * 1024, spill_path="spill.db")
+
+The spill file is scratch space for this process, not persistence: it is
+cleared on startup, like the in-memory state it extends. Give each process
+its own path.
+
+The thread being read or written is never evicted, so a single thread larger
+than the cap still works. Sizes count serialized bytes only, so the real
+footprint is somewhat higher.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import get_checkpoint_id
+from langgraph.checkpoint.memory import InMemorySaver
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+SPILL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spill_checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    parent_checkpoint_id TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS spill_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS spill_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version NOT NULL,
+    type TEXT,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+"""
+
+
+def _typed_size(typed: Tuple[str, bytes]) -> int:
+    return len(typed[0]) + len(typed[1])
+
+
+def _checkpoint_size(saved: tuple) -> int:
+    checkpoint, metadata, _ = saved
+    return _typed_size(checkpoint) + _typed_size(metadata)
+
+
+def _writes_size(writes: dict) -> int:
+    return sum(_typed_size(value) + len(channel) for _, channel, value, _ in writes.values())
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """`InMemorySaver` with a byte cap, per-thread LRU eviction and optional spill to SQLite."""
+
+    def __init__(self, *, max_bytes: int = DEFAULT_MAX_BYTES, spill_path: Optional[str] = None, serde=None):
+        super().__init__(serde=serde)
+        self.max_bytes = max_bytes
+        # thread_id -> serialized bytes held in memory, least recently used first
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.RLock()
+        self.spill = None
+        self._spilled: set = set()
+        if spill_path is not None:
+            self.spill = sqlite3.connect(spill_path, check_same_thread=False)
+            self.spill.executescript(SPILL_SCHEMA)
+            with self.spill:
+                for table in ("spill_checkpoints", "spill_writes", "spill_blobs"):
+                    self.spill.execute(f"DELETE FROM {table}")
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._total
+
+    def _touch(self, thread_id: str) -> None:
+        if thread_id in self._spilled:
+            self._reload(thread_id)
+        if thread_id in self._sizes:
+            self._sizes.move_to_end(thread_id)
+
+    def _grow(self, thread_id: str, added: int) -> None:
+        self._sizes[thread_id] = self._sizes.get(thread_id, 0) + added
+        self._sizes.move_to_end(thread_id)
+        self._total += added
+
+    def _evict(self, keep: str) -> None:
+        while self._total > self.max_bytes:
+            victim = next((thread_id for thread_id in self._sizes if thread_id != keep), None)
+            if victim is None:
+                return
+            if self.spill is not None:
+                self._spill(victim)
+            self._drop(victim)
+
+    def _drop(self, thread_id: str) -> None:
+        self._total -= self._sizes.pop(thread_id, 0)
+        super().delete_thread(thread_id)
+
+    def _spill(self, thread_id: str) -> None:
+        checkpoints = [
+            (thread_id, ns, checkpoint_id, *checkpoint, *metadata, parent)
+            for ns, saved in self.storage.get(thread_id, {}).items()
+            for checkpoint_id, (checkpoint, metadata, parent) in saved.items()
+        ]
+        writes = [
+            (thread_id, ns, checkpoint_id, task_id, idx, channel, *value, task_path)
+            for (tid, ns, checkpoint_id), stored in self.writes.items()
+            if tid == thread_id
+            for (task_id, idx), (_, channel, value, task_path) in stored.items()
+        ]
+        blobs = [(tid, ns, channel, version, *value) for (tid, ns, channel, version), value in self.blobs.items() if tid == thread_id]
+        # Pending writes can arrive before the thread's first checkpoint;
+        # they are spilled too, since the thread is dropped from memory after.
+        if not (checkpoints or writes or blobs):
+            return
+        with self.spill:
+            self.spill.executemany("INSERT OR REPLACE INTO spill_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", checkpoints)
+            self.spill.executemany("INSERT OR REPLACE INTO spill_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", writes)
+            self.spill.executemany("INSERT OR REPLACE INTO spill_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+        self._spilled.add(thread_id)
+
+    def _reload(self, thread_id: str) -> None:
+        added = 0
+        for ns, checkpoint_id, type_, checkpoint, metadata_type, metadata, parent in self.spill.execute(
+            "SELECT checkpoint_ns, checkpoint_id, type, checkpoint, metadata_type, metadata, parent_checkpoint_id "
+            "FROM spill_checkpoints WHERE thread_id = ?",
+            (thread_id,),
+        ):
+            saved = ((type_, checkpoint), (metadata_type, metadata), parent)
+            self.storage[thread_id][ns][checkpoint_id] = saved
+            added += _checkpoint_size(saved)
+        for ns, checkpoint_id, task_id, idx, channel, type_, value, task_path in self.spill.execute(
+            "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path "
+            "FROM spill_writes WHERE thread_id = ?",
+            (thread_id,),
+        ):
+            self.writes[(thread_id, ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (type_, value), task_path)
+            added += len(channel) + _typed_size((type_, value))
+        for ns, channel, version, type_, blob in self.spill.execute(
+            "SELECT checkpoint_ns, channel, version, type, blob FROM spill_blobs WHERE thread_id = ?",
+            (thread_id,),
+        ):
+            self.blobs[(thread_id, ns, channel, version)] = (type_, blob)
+            added += _typed_size((type_, blob))
+        self._delete_spilled(thread_id)
+        self._grow(thread_id, added)
+        self._evict(keep=thread_id)
+
+    def _delete_spilled(self, thread_id: str) -> None:
+        with self.spill:
+            for table in ("spill_checkpoints", "spill_writes", "spill_blobs"):
+                self.spill.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        self._spilled.discard(thread_id)
+
+    def _forget_unknown(self, thread_id: str) -> None:
+        # InMemorySaver's reads create empty entries for threads they don't find.
+        if thread_id not in self._sizes and not any(self.storage.get(thread_id, {}).values()):
+            self.storage.pop(thread_id, None)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._touch(thread_id)
+            found = super().get_tuple(config)
+            self._forget_unknown(thread_id)
+            return found
+
+    def get_delta_channel_history(self, *, config, channels: Sequence[str]):
+        with self._lock:
+            self._touch(config["configurable"]["thread_id"])
+            return super().get_delta_channel_history(config=config, channels=channels)
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator[Any]:
+        if config is not None:
+            with self._lock:
+                self._touch(config["configurable"]["thread_id"])
+                found = [*super().list(config, filter=filter, before=before, limit=limit)]
+                self._forget_unknown(config["configurable"]["thread_id"])
+            yield from found
+            return
+
+        # Across all threads, spilled ones included, loading one thread at a time.
+        with self._lock:
+            thread_ids = [*self._sizes, *self._spilled]
+        for thread_id in thread_ids:
+            if limit is not None and limit <= 0:
+                return
+            for item in self.list({"configurable": {"thread_id": thread_id}}, filter=filter, before=before, limit=limit):
+                if limit is not None:
+                    limit -= 1
+                yield item
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            added = _checkpoint_size(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])
+            added += sum(_typed_size(self.blobs[(thread_id, checkpoint_ns, k, v)]) for k, v in new_versions.items())
+            self._grow(thread_id, added)
+            self._evict(keep=thread_id)
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""), get_checkpoint_id(config))
+        with self._lock:
+            self._touch(thread_id)
+            before = _writes_size(self.writes.get(key, {}))
+            super().put_writes(config, writes, task_id, task_path)
+            self._grow(thread_id, _writes_size(self.writes.get(key, {})) - before)
+            self._evict(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+            if thread_id in self._spilled:
+                self._delete_spilled(thread_id)
@@ -0,0 +1,562 @@
+"""
+SQLite checkpointers that keep a registry of chat threads next to the
+checkpoints LangGraph writes.
+
+`checkpointer.list(None)` has to read and deserialise every checkpoint of
+every thread just to collect the distinct thread ids. The `thread_registry`
+table holds one row per thread instead, upserted in the same transaction
+as every checkpoint written, so listing threads is an indexed query over threads only. Each row
+also carries what a sidebar needs to render the thread without loading its
+state: the title (first user message), last activity and message count.
+
+Both savers can also store the `messages` channel delta-encoded (see
+message_deltas.py); `message_deltas` records which checkpoint each delta is
+based on, so retention keeps the chain back to its snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import aiosqlite
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from compressed_serde import compressed_serializer
+from message_deltas import MessageDeltas, apply_delta, delta_base, is_delta
+
+TITLE_MAX_LEN = 40
+
+REGISTRY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thread_registry (
+    thread_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    title TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS thread_registry_updated_at
+    ON thread_registry (updated_at DESC);
+CREATE TABLE IF NOT EXISTS message_deltas (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    base_checkpoint_id TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+"""
+
+# Registries created before message_count existed; same approach as the
+# `task_path` migration in SqliteSaver.setup.
+REGISTRY_MIGRATION = (
+    "ALTER TABLE thread_registry ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"
+)
+
+# The first title seen sticks; later writes only move updated_at forward and
+# refresh message_count when the checkpoint carries the messages channel.
+REGISTRY_UPSERT = """
+INSERT INTO thread_registry (thread_id, created_at, updated_at, title, message_count)
+VALUES (?, ?, ?, ?, COALESCE(?, 0))
+ON CONFLICT (thread_id) DO UPDATE SET
+    updated_at = MAX(thread_registry.updated_at, excluded.updated_at),
+    title = COALESCE(thread_registry.title, excluded.title),
+    message_count = CASE WHEN ? IS NULL
+        THEN thread_registry.message_count ELSE excluded.message_count END
+"""
+
+REGISTRY_PAGE = """
+SELECT thread_id, created_at, updated_at, title, message_count
+FROM thread_registry
+ORDER BY updated_at DESC, thread_id
+LIMIT ? OFFSET ?
+"""
+
+# SqliteSaver.put's statement, run here next to the delta and registry rows
+# so all three commit together.
+CHECKPOINT_INSERT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+DELTA_INSERT = (
+    "INSERT OR REPLACE INTO message_deltas "
+    "(thread_id, checkpoint_ns, checkpoint_id, base_checkpoint_id) VALUES (?, ?, ?, ?)"
+)
+
+_SELECT_CHECKPOINT = (
+    "SELECT type, checkpoint FROM checkpoints "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+)
+
+_REGISTRY_COLUMNS = ("thread_id", "created_at", "updated_at", "title", "message_count")
+
+_REGISTRY_EXISTS = (
+    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'thread_registry'"
+)
+_BACKFILL_THREADS = "SELECT DISTINCT thread_id FROM checkpoints WHERE checkpoint_ns = ''"
+_BACKFILL_CHECKPOINT = (
+    "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+    "ORDER BY checkpoint_id {order} LIMIT 1"
+)
+
+
+def chat_title(messages: Any, max_len: int = TITLE_MAX_LEN) -> Optional[str]:
+    """Title from the first user message, truncated the way the sidebars do."""
+    if not isinstance(messages, list):
+        return None
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            text = message.text
+            return text[:max_len] + "..." if len(text) > max_len else text
+    return None
+
+
+def registry_row(config: RunnableConfig, checkpoint: Checkpoint) -> tuple:
+    """REGISTRY_UPSERT parameters for a checkpoint being written."""
+    channel_values = checkpoint.get("channel_values", {})
+    messages = channel_values.get("messages")
+    message_count = len(messages) if isinstance(messages, list) else None
+    if messages is None:
+        # The input checkpoint only carries the user's messages on __start__.
+        messages = (channel_values.get("__start__") or {}).get("messages")
+    return (
+        str(config["configurable"]["thread_id"]),
+        checkpoint["ts"],
+        checkpoint["ts"],
+        chat_title(messages),
+        message_count,
+        message_count,
+    )
+
+
+def _checkpoint_row(
+    serde: SerializerProtocol,
+    config: RunnableConfig,
+    checkpoint: Checkpoint,
+    metadata: CheckpointMetadata,
+) -> tuple:
+    """CHECKPOINT_INSERT parameters, serialized the way SqliteSaver.put does."""
+    type_, serialized_checkpoint = serde.dumps_typed(checkpoint)
+    serialized_metadata = json.dumps(
+        get_checkpoint_metadata(config, metadata), ensure_ascii=False
+    ).encode("utf-8", "ignore")
+    return (
+        str(config["configurable"]["thread_id"]),
+        config["configurable"]["checkpoint_ns"],
+        checkpoint["id"],
+        config["configurable"].get("checkpoint_id"),
+        type_,
+        serialized_checkpoint,
+        serialized_metadata,
+    )
+
+
+def _saved_config(config: RunnableConfig, checkpoint: Checkpoint) -> RunnableConfig:
+    return {
+        "configurable": {
+            "thread_id": config["configurable"]["thread_id"],
+            "checkpoint_ns": config["configurable"]["checkpoint_ns"],
+            "checkpoint_id": checkpoint["id"],
+        }
+    }
+
+
+def _encode_messages(
+    deltas: Optional[MessageDeltas], config: RunnableConfig, checkpoint: Checkpoint
+) -> Tuple[Checkpoint, Optional[tuple]]:
+    """Checkpoint to store and, for a delta, its message_deltas row."""
+    messages = checkpoint["channel_values"].get("messages")
+    if deltas is None or not isinstance(messages, list):
+        return checkpoint, None
+    thread_id = str(config["configurable"]["thread_id"])
+    checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+    value, base = deltas.encode(
+        thread_id, checkpoint_ns, config["configurable"].get("checkpoint_id"), checkpoint["id"], messages
+    )
+    if base is None:
+        return checkpoint, None
+    stored = {**checkpoint, "channel_values": {**checkpoint["channel_values"], "messages": value}}
+    return stored, (thread_id, checkpoint_ns, checkpoint["id"], base)
+
+
+def _with_messages(saved: CheckpointTuple, messages: List[Any]) -> CheckpointTuple:
+    checkpoint = saved.checkpoint
+    channel_values = {**checkpoint["channel_values"], "messages": messages}
+    return saved._replace(checkpoint={**checkpoint, "channel_values": channel_values})
+
+
+def _replay(chain: List[Any], messages: List[Any]) -> List[Any]:
+    # `chain` runs from the requested checkpoint back towards the snapshot.
+    for delta in reversed(chain):
+        messages = apply_delta(messages, delta)
+    return messages
+
+
+def _page_args(limit: Optional[int], offset: int) -> Tuple[int, int]:
+    # SQLite treats a negative LIMIT as "no limit".
+    return (-1 if limit is None else limit, offset)
+
+
+class ReaderPool:
+    """
+    Fixed set of read-only connections to a WAL database.
+
+    In WAL mode readers never block the writer or each other, so checkpoint
+    reads can run while another session is committing a checkpoint.
+    """
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 30.0):
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._connections = []
+        for _ in range(size):
+            conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False, timeout=timeout
+            )
+            self._connections.append(conn)
+            self._idle.put(conn)
+
+    @contextmanager
+    def cursor(self) -> Iterator[sqlite3.Cursor]:
+        conn = self._idle.get()
+        cur = conn.cursor()
+        try:
+            # One read transaction, so multi-statement reads see one snapshot.
+            cur.execute("BEGIN")
+            yield cur
+        finally:
+            conn.rollback()
+            cur.close()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        for conn in self._connections:
+            conn.close()
+
+
+class RegistrySqliteSaver(SqliteSaver):
+    """
+    `SqliteSaver` that maintains `thread_registry` on every root checkpoint.
+
+    With a `ReaderPool`, reads (`get_tuple`, `list`, `list_threads`) run on
+    the pool instead of queueing on the writer connection's lock. With
+    `message_deltas`, new checkpoints store their messages delta-encoded;
+    delta rows are always decoded on read, whatever the current mode.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        readers: Optional[ReaderPool] = None,
+        message_deltas: Optional[MessageDeltas] = None,
+    ) -> None:
+        super().__init__(conn, serde=serde)
+        self.readers = readers
+        self.message_deltas = message_deltas
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if transaction or self.readers is None:
+            with super().cursor(transaction) as cur:
+                yield cur
+            return
+        if not self.is_setup:
+            with self.lock:
+                self.setup()
+        with self.readers.cursor() as cur:
+            yield cur
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        existed = self.conn.execute(_REGISTRY_EXISTS).fetchone() is not None
+        self.conn.executescript(REGISTRY_SCHEMA)
+        migrated = True
+        try:
+            self.conn.execute(REGISTRY_MIGRATION)
+        except sqlite3.OperationalError as e:
+            if "duplicate column name" not in str(e):
+                raise
+            migrated = False
+        if not existed or migrated:
+            self._backfill_registry()
+        self.conn.commit()
+
+    def _backfill_registry(self) -> None:
+        # One-off migration for databases written before the registry existed:
+        # reads the first and latest checkpoint per thread, never the whole history.
+        rows = []
+        for (thread_id,) in self.conn.execute(_BACKFILL_THREADS).fetchall():
+            first = self.serde.loads_typed(
+                self.conn.execute(_BACKFILL_CHECKPOINT.format(order="ASC"), (thread_id,)).fetchone()
+            )
+            latest = self.serde.loads_typed(
+                self.conn.execute(_BACKFILL_CHECKPOINT.format(order="DESC"), (thread_id,)).fetchone()
+            )
+            row = registry_row({"configurable": {"thread_id": thread_id}}, latest)
+            rows.append((thread_id, first["ts"], *row[2:]))
+        self.conn.executemany(REGISTRY_UPSERT, rows)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        stored, delta_row = _encode_messages(self.message_deltas, config, checkpoint)
+        row = _checkpoint_row(self.serde, config, stored, metadata)
+        with self.cursor() as cur:
+            # cursor() commits even on error; roll back so a checkpoint is
+            # never stored without its delta or registry row.
+            try:
+                cur.execute(CHECKPOINT_INSERT, row)
+                if delta_row:
+                    cur.execute(DELTA_INSERT, delta_row)
+                if not config["configurable"].get("checkpoint_ns"):
+                    cur.execute(REGISTRY_UPSERT, registry_row(config, checkpoint))
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return _saved_config(config, checkpoint)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        saved = super().get_tuple(config)
+        return self._decode_messages(saved) if saved is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        # Drain the rows first: without a reader pool SqliteSaver.list holds
+        # the connection lock while iterating, which decoding needs.
+        rows = [*super().list(config, filter=filter, before=before, limit=limit)]
+        for saved in rows:
+            yield self._decode_messages(saved)
+
+    def _decode_messages(self, saved: CheckpointTuple) -> CheckpointTuple:
+        value = saved.checkpoint["channel_values"].get("messages")
+        if not is_delta(value):
+            return saved
+        thread_id = saved.config["configurable"]["thread_id"]
+        checkpoint_ns = saved.config["configurable"].get("checkpoint_ns", "")
+        chain = [value]
+        while True:
+            base_id = delta_base(chain[-1])
+            cached = (
+                self.message_deltas.cached(thread_id, checkpoint_ns, base_id)
+                if self.message_deltas
+                else None
+            )
+            if cached is not None:
+                return _with_messages(saved, _replay(chain, cached))
+            with self.cursor(transaction=False) as cur:
+                row = cur.execute(_SELECT_CHECKPOINT, (thread_id, checkpoint_ns, base_id)).fetchone()
+            if row is None:
+                raise ValueError(f"Checkpoint {base_id} of thread {thread_id} is missing; delta chain is broken")
+            base = self.serde.loads_typed(row)["channel_values"].get("messages", [])
+            if not is_delta(base):
+                return _with_messages(saved, _replay(chain, base))
+            chain.append(base)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_registry WHERE thread_id = ?", (str(thread_id),))
+            cur.execute("DELETE FROM message_deltas WHERE thread_id = ?", (str(thread_id),))
+
+    def list_threads(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Registry rows, most recently active first."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute(REGISTRY_PAGE, _page_args(limit, offset))
+            return [dict(zip(_REGISTRY_COLUMNS, row)) for row in cur.fetchall()]
+
+
+def make_checkpointer(
+    path: str = "chatbot.db", readers: int = 4, snapshot_every: int = 0, compress: bool = False
+) -> RegistrySqliteSaver:
+    """
+    Checkpointer on `path` with one writer connection and `readers` read-only
+    connections. The database is switched to WAL (so readers and the writer
+    don't block each other) with synchronous=NORMAL, which is durable across
+    application crashes and only risks the last commits on power loss.
+    New files are created with auto_vacuum=INCREMENTAL so retention can
+    shrink them online.
+
+    `snapshot_every` > 1 turns on delta-encoded messages with a full snapshot
+    every that many checkpoints. `compress` zstd-compresses checkpoint and
+    write blobs with the database's trained dictionary (compressed_serde.py).
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+    # Only takes effect on a new, empty file; see retention.py for converting
+    # an existing one.
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    deltas = MessageDeltas(snapshot_every) if snapshot_every > 1 else None
+    serde = (
+        compressed_serializer(conn, path if path != ":memory:" else None) if compress else None
+    )
+    saver = RegistrySqliteSaver(conn, serde=serde, message_deltas=deltas)
+    with saver.lock:
+        # Tables must exist before a read-only connection can query them.
+        saver.setup()
+    if readers > 0 and path != ":memory:":
+        saver.readers = ReaderPool(path, readers)
+    return saver
+
+
+class RegistryAsyncSqliteSaver(AsyncSqliteSaver):
+    """Async counterpart of `RegistrySqliteSaver` for the aiosqlite backends."""
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        message_deltas: Optional[MessageDeltas] = None,
+    ) -> None:
+        super().__init__(conn, serde=serde)
+        self.message_deltas = message_deltas
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await super().setup()
+        async with self.lock:
+            async with self.conn.execute(_REGISTRY_EXISTS) as cur:
+                existed = await cur.fetchone() is not None
+            await self.conn.executescript(REGISTRY_SCHEMA)
+            migrated = True
+            try:
+                await self.conn.execute(REGISTRY_MIGRATION)
+            except aiosqlite.OperationalError as e:
+                if "duplicate column name" not in str(e):
+                    raise
+                migrated = False
+            if not existed or migrated:
+                await self._backfill_registry()
+            await self.conn.commit()
+
+    async def _backfill_registry(self) -> None:
+        rows = []
+        async with self.conn.execute(_BACKFILL_THREADS) as cur:
+            thread_ids = [thread_id for (thread_id,) in await cur.fetchall()]
+        for thread_id in thread_ids:
+            async with self.conn.execute(
+                _BACKFILL_CHECKPOINT.format(order="ASC"), (thread_id,)
+            ) as cur:
+                first = self.serde.loads_typed(await cur.fetchone())
+            async with self.conn.execute(
+                _BACKFILL_CHECKPOINT.format(order="DESC"), (thread_id,)
+            ) as cur:
+                latest = self.serde.loads_typed(await cur.fetchone())
+            row = registry_row({"configurable": {"thread_id": thread_id}}, latest)
+            rows.append((thread_id, first["ts"], *row[2:]))
+        await self.conn.executemany(REGISTRY_UPSERT, rows)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self.setup()
+        stored, delta_row = _encode_messages(self.message_deltas, config, checkpoint)
+        row = _checkpoint_row(self.serde, config, stored, metadata)
+        async with self.lock:
+            try:
+                await self.conn.execute(CHECKPOINT_INSERT, row)
+                if delta_row:
+                    await self.conn.execute(DELTA_INSERT, delta_row)
+                if not config["configurable"].get("checkpoint_ns"):
+                    await self.conn.execute(REGISTRY_UPSERT, registry_row(config, checkpoint))
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            await self.conn.commit()
+        return _saved_config(config, checkpoint)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        saved = await super().aget_tuple(config)
+        return await self._adecode_messages(saved) if saved is not None else None
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        # Drained first for the same reason as RegistrySqliteSaver.list.
+        rows = [saved async for saved in super().alist(config, filter=filter, before=before, limit=limit)]
+        for saved in rows:
+            yield await self._adecode_messages(saved)
+
+    async def _adecode_messages(self, saved: CheckpointTuple) -> CheckpointTuple:
+        value = saved.checkpoint["channel_values"].get("messages")
+        if not is_delta(value):
+            return saved
+        thread_id = saved.config["configurable"]["thread_id"]
+        checkpoint_ns = saved.config["configurable"].get("checkpoint_ns", "")
+        chain = [value]
+        while True:
+            base_id = delta_base(chain[-1])
+            cached = (
+                self.message_deltas.cached(thread_id, checkpoint_ns, base_id)
+                if self.message_deltas
+                else None
+            )
+            if cached is not None:
+                return _with_messages(saved, _replay(chain, cached))
+            async with self.lock, self.conn.execute(
+                _SELECT_CHECKPOINT, (thread_id, checkpoint_ns, base_id)
+            ) as cur:
+                row = await cur.fetchone()
+            if row is None:
+                raise ValueError(f"Checkpoint {base_id} of thread {thread_id} is missing; delta chain is broken")
+            base = self.serde.loads_typed(tuple(row))["channel_values"].get("messages", [])
+            if not is_delta(base):
+                return _with_messages(saved, _replay(chain, base))
+            chain.append(base)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute(
+                "DELETE FROM thread_registry WHERE thread_id = ?", (str(thread_id),)
+            )
+            await self.conn.execute(
+                "DELETE FROM message_deltas WHERE thread_id = ?", (str(thread_id),)
+            )
+            await self.conn.commit()
+
+    async def alist_threads(
+        self, limit: Optional[int] = None, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        await self.setup()
+        async with self.lock, self.conn.execute(REGISTRY_PAGE, _page_args(limit, offset)) as cur:
+            return [dict(zip(_REGISTRY_COLUMNS, row)) for row in await cur.fetchall()]
@@ -0,0 +1,107 @@
+"""
+Concurrency benchmark for the chat checkpointer.
+
+Simulates N chat sessions, each on its own thread, taking turns the way a
+LangGraph invoke does: read the latest checkpoint, then write a new one with
+the conversation grown by a user and an assistant message. The same workload
+runs against a single shared connection (the old backends' setup) and
+against `make_checkpointer`'s writer + read-only pool:
+
+    python checkpointer_benchmark.py --sessions 16 --turns 40 --readers 4
+
+Reports p50/p99 latency of checkpoint put and get per configuration.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+
+from checkpointer import RegistrySqliteSaver, make_checkpointer
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _session(saver, thread_id: str, turns: int, message_bytes: int, timings: Dict[str, List[float]]) -> None:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    messages = []
+    for turn in range(turns):
+        started = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": thread_id}})
+        timings["get"].append(time.perf_counter() - started)
+
+        messages = messages + [
+            HumanMessage("q" * message_bytes, id=f"{thread_id}-{turn}-q"),
+            AIMessage("a" * message_bytes, id=f"{thread_id}-{turn}-a"),
+        ]
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=turn))
+        checkpoint["channel_values"] = {"messages": messages}
+        checkpoint["channel_versions"] = {"messages": turn + 1}
+        started = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop", "step": turn}, {})
+        timings["put"].append(time.perf_counter() - started)
+
+
+def run(make_saver: Callable[[str], object], sessions: int, turns: int, message_bytes: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        saver = make_saver(os.path.join(tmp, "bench.db"))
+        timings: Dict[str, List[float]] = {"get": [], "put": []}
+        workers = [
+            threading.Thread(target=_session, args=(saver, f"session-{i}", turns, message_bytes, timings))
+            for i in range(sessions)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        if getattr(saver, "readers", None) is not None:
+            saver.readers.close()
+        saver.conn.close()
+
+    row = {"turns_per_s": sessions * turns / elapsed}
+    for op, samples in timings.items():
+        row[f"{op}_p50_ms"] = statistics.median(samples) * 1000
+        row[f"{op}_p99_ms"] = _percentile(samples, 0.99) * 1000
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--message-bytes", type=int, default=400)
+    args = parser.parse_args()
+
+    configs = {
+        "single": lambda path: RegistrySqliteSaver(sqlite3.connect(path, check_same_thread=False)),
+        "pooled": lambda path: make_checkpointer(path, readers=args.readers),
+    }
+    print(f"{args.sessions} sessions x {args.turns} turns\n")
+    print(f"{'config':<8}{'turns/s':>9}{'get p50':>9}{'get p99':>9}{'put p50':>9}{'put p99':>9}  (ms)")
+    for name, make_saver in configs.items():
+        row = run(make_saver, args.sessions, args.turns, args.message_bytes)
+        print(
+            f"{name:<8}{row['turns_per_s']:>9.0f}{row['get_p50_ms']:>9.2f}{row['get_p99_ms']:>9.2f}"
+            f"{row['put_p50_ms']:>9.2f}{row['put_p99_ms']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
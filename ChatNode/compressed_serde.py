@@ -0,0 +1,218 @@
+"""
+zstd compression for checkpoint and pending-write blobs.
+
+Checkpoints repeat the same system prompts, tool schemas and message
+envelopes row after row, so a zstd dictionary trained on a sample of the
+existing rows compresses even small blobs (like delta-encoded checkpoints)
+well. Dictionaries are stored in the database itself, in `serde_dictionaries`,
+and a compressed blob's type records the dictionary it needs:
+
+    msgpack            plain, as written by JsonPlusSerializer
+    msgpack+raw        too small to be worth compressing
+    msgpack+zstd:0     zstd without a dictionary
+    msgpack+zstd:3     zstd with dictionary 3
+
+Rows written before compression was enabled keep their plain type and are
+read as before. Dictionaries are only trained on request
+(`compression_report.py --train`); a dictionary another process stored
+after this one started is loaded from the database the first time a blob
+needs it.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.base import CipherProtocol
+from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+DICTIONARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS serde_dictionaries (
+    dict_id INTEGER PRIMARY KEY,
+    dictionary BLOB NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# A random sample of blobs from both tables, for training and the report.
+_SAMPLE_ROWS = """
+SELECT type, blob FROM (
+    SELECT type, checkpoint AS blob FROM checkpoints
+    UNION ALL
+    SELECT type, value AS blob FROM writes WHERE length(value) > 0
+)
+ORDER BY random()
+LIMIT ?
+"""
+
+
+class ZstdCodec(CipherProtocol):
+    """
+    zstd transform plugged into LangGraph's `EncryptedSerializer` hook, which
+    appends the codec name to the serializer's type and keeps reading rows
+    without one as plain (and keeps the msgpack allowlist working).
+
+    Compresses with the newest dictionary; blobs under `min_size` bytes, or
+    that don't shrink, are stored as-is under the name "raw". `loader`
+    fetches a dictionary this codec doesn't hold yet by id (see
+    `dictionary_loader`).
+    """
+
+    def __init__(
+        self,
+        level: int = 3,
+        min_size: int = 64,
+        loader: Optional[Callable[[int], Optional[bytes]]] = None,
+    ):
+        self.level = level
+        self.min_size = min_size
+        self.loader = loader
+        self.dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self.active_dict_id = 0
+        self._lock = threading.Lock()
+        # zstd (de)compressor objects are not safe to share between threads.
+        self._local = threading.local()
+
+    def add_dictionary(self, dict_id: int, data: bytes) -> None:
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dictionary.precompute_compress(level=self.level)
+        with self._lock:
+            self.dictionaries[dict_id] = dictionary
+            self.active_dict_id = max(self.active_dict_id, dict_id)
+
+    def _dictionary(self, dict_id: int) -> zstandard.ZstdCompressionDict:
+        if dict_id not in self.dictionaries and self.loader is not None:
+            data = self.loader(dict_id)
+            if data is not None:
+                self.add_dictionary(dict_id, data)
+        if dict_id not in self.dictionaries:
+            raise ValueError(f"zstd dictionary {dict_id} is not loaded")
+        return self.dictionaries[dict_id]
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        cached = getattr(self._local, "compressor", None)
+        if cached is None or cached[0] != self.active_dict_id:
+            dictionary = self.dictionaries.get(self.active_dict_id)
+            cached = (self.active_dict_id, zstandard.ZstdCompressor(level=self.level, dict_data=dictionary))
+            self._local.compressor = cached
+        return cached[1]
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        if dict_id not in decompressors:
+            dictionary = self._dictionary(dict_id) if dict_id else None
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return decompressors[dict_id]
+
+    def encrypt(self, plaintext: bytes) -> Tuple[str, bytes]:
+        if len(plaintext) >= self.min_size:
+            compressed = self._compressor().compress(plaintext)
+            if len(compressed) < len(plaintext):
+                return f"zstd:{self.active_dict_id}", compressed
+        return "raw", plaintext
+
+    def decrypt(self, ciphername: str, ciphertext: bytes) -> bytes:
+        if ciphername == "raw":
+            return ciphertext
+        codec, _, dict_id = ciphername.partition(":")
+        if codec != "zstd":
+            raise ValueError(f"Unsupported checkpoint codec {ciphername!r}")
+        return self._decompressor(int(dict_id)).decompress(ciphertext)
+
+
+def load_dictionaries(conn: sqlite3.Connection, codec: ZstdCodec) -> int:
+    """Load every stored dictionary into `codec`; returns how many there are."""
+    conn.execute(DICTIONARY_SCHEMA)
+    conn.commit()
+    rows = conn.execute("SELECT dict_id, dictionary FROM serde_dictionaries").fetchall()
+    for dict_id, data in rows:
+        codec.add_dictionary(dict_id, data)
+    return len(rows)
+
+
+def dictionary_loader(path: str) -> Callable[[int], Optional[bytes]]:
+    """
+    `ZstdCodec` loader reading one stored dictionary from the database at
+    `path`, over a short-lived connection of its own.
+    """
+
+    def load(dict_id: int) -> Optional[bytes]:
+        with closing(sqlite3.connect(path, timeout=30.0)) as conn:
+            row = conn.execute(
+                "SELECT dictionary FROM serde_dictionaries WHERE dict_id = ?", (dict_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    return load
+
+
+def sample_blobs(
+    conn: sqlite3.Connection, codec: ZstdCodec, limit: int = 2000
+) -> List[Tuple[str, bytes]]:
+    """
+    Up to `limit` random (serializer type, uncompressed blob) rows from
+    checkpoints and writes; compressed rows are decompressed with `codec`.
+    """
+    tables = {
+        name
+        for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('checkpoints', 'writes')"
+        )
+    }
+    if len(tables) < 2:
+        return []
+    samples = []
+    for type_, blob in conn.execute(_SAMPLE_ROWS, (limit,)):
+        if "+" in type_:
+            type_, codec_name = type_.split("+", 1)
+            blob = codec.decrypt(codec_name, blob)
+        samples.append((type_, bytes(blob)))
+    return samples
+
+
+def train_dictionary(
+    conn: sqlite3.Connection,
+    codec: ZstdCodec,
+    dict_size: int = 112 * 1024,
+    sample_limit: int = 2000,
+    min_samples: int = 200,
+) -> Optional[int]:
+    """
+    Train a dictionary on existing rows, store it and make it `codec`'s
+    active one. Returns its id, or None when there is too little data yet.
+    """
+    samples = [blob for _, blob in sample_blobs(conn, codec, sample_limit)]
+    if len(samples) < min_samples:
+        return None
+    try:
+        dictionary = zstandard.train_dictionary(dict_size, samples, level=codec.level)
+    except zstandard.ZstdError:
+        return None
+    data = dictionary.as_bytes()
+    dict_id = conn.execute(
+        "INSERT INTO serde_dictionaries (dictionary) VALUES (?)", (data,)
+    ).lastrowid
+    conn.commit()
+    codec.add_dictionary(dict_id, data)
+    return dict_id
+
+
+def compressed_serializer(
+    conn: sqlite3.Connection, path: Optional[str] = None
+) -> EncryptedSerializer:
+    """
+    Serializer for the checkpoint database behind `conn`, with its stored
+    dictionaries loaded. Never trains one itself: other processes may be
+    writing to the same file. With `path`, dictionaries stored later are
+    read from that file when a blob needs them, so `conn` may be closed.
+    """
+    codec = ZstdCodec(loader=dictionary_loader(path) if path is not None else None)
+    load_dictionaries(conn, codec)
+    return EncryptedSerializer(codec, JsonPlusSerializer())
@@ -0,0 +1,102 @@
+"""
+Size and speed report for compressed checkpoint blobs.
+
+Samples checkpoint and pending-write rows from a checkpoint database, trains
+a zstd dictionary on part of the sample and measures the rest under each
+storage format: the current plain msgpack, zstd without a dictionary and
+zstd with the trained dictionary:
+
+    python compression_report.py chatbot.db --samples 2000
+
+With --train the dictionary trained on the whole sample is also stored in
+the database. Running backends with CHECKPOINT_COMPRESSION=1 read rows
+compressed with it straight away and compress with it once restarted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from typing import Any, Dict, List, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from compressed_serde import ZstdCodec, load_dictionaries, sample_blobs, train_dictionary
+
+
+def _measure(serde, objects: List[Any]) -> Dict[str, float]:
+    started = time.perf_counter()
+    encoded = [serde.dumps_typed(obj) for obj in objects]
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for blob in encoded:
+        serde.loads_typed(blob)
+    decode_seconds = time.perf_counter() - started
+
+    return {
+        "bytes": sum(len(data) for _, data in encoded),
+        "encode_us": encode_seconds * 1e6 / len(objects),
+        "decode_us": decode_seconds * 1e6 / len(objects),
+    }
+
+
+def report(
+    samples: List[Tuple[str, bytes]], train_fraction: float = 0.5, dict_size: int = 112 * 1024
+) -> List[dict]:
+    """Compare the formats on the held-out part of `samples`."""
+    plain = JsonPlusSerializer()
+    split = int(len(samples) * train_fraction)
+    training, held_out = samples[:split], samples[split:]
+    objects = [plain.loads_typed(sample) for sample in held_out]
+
+    without_dict = ZstdCodec()
+    with_dict = ZstdCodec()
+    dictionary = zstandard.train_dictionary(dict_size, [blob for _, blob in training])
+    with_dict.add_dictionary(1, dictionary.as_bytes())
+
+    formats = {
+        "plain": plain,
+        "zstd": EncryptedSerializer(without_dict, plain),
+        "zstd+dict": EncryptedSerializer(with_dict, plain),
+    }
+    rows = [{"format": name, **_measure(serde, objects)} for name, serde in formats.items()]
+    baseline = rows[0]["bytes"]
+    for row in rows:
+        row["ratio"] = baseline / row["bytes"]
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("db", help="checkpoint database, e.g. chatbot.db")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--dict-size", type=int, default=112 * 1024)
+    parser.add_argument("--train", action="store_true", help="store a dictionary trained on the sample")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    codec = ZstdCodec()
+    load_dictionaries(conn, codec)
+    samples = sample_blobs(conn, codec, args.samples)
+    if len(samples) < 20:
+        raise SystemExit(f"Only {len(samples)} blobs in {args.db}; not enough to train on")
+
+    print(f"{len(samples)} sampled blobs, half for training, half measured\n")
+    print(f"{'format':<11}{'bytes':>12}{'ratio':>8}{'encode us':>11}{'decode us':>11}")
+    for row in report(samples, dict_size=args.dict_size):
+        print(
+            f"{row['format']:<11}{row['bytes']:>12}{row['ratio']:>8.2f}"
+            f"{row['encode_us']:>11.1f}{row['decode_us']:>11.1f}"
+        )
+
+    if args.train:
+        dict_id = train_dictionary(conn, codec, dict_size=args.dict_size, sample_limit=args.samples, min_samples=1)
+        print(f"\nStored dictionary {dict_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Paged reads of a thread's messages for the chat frontends.
+
+A page is the last `limit` messages before a cursor, plus the cursor for
+the page before it. Cursors are positions in the thread's message list,
+which `add_messages` only appends to, so they stay valid while the thread
+keeps growing. Pages are read straight from the latest checkpoint (no
+`get_state` snapshot) and only the page is handed to the UI to convert and
+render.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 30
+
+Page = Tuple[List[Any], Optional[int]]
+
+
+def message_page(messages: List[Any], limit: int = DEFAULT_PAGE_SIZE, before: Optional[int] = None) -> Page:
+    """Slice one page; the returned cursor is None once the start is reached."""
+    end = len(messages) if before is None else max(0, min(before, len(messages)))
+    start = max(0, end - limit)
+    return messages[start:end], (start if start > 0 else None)
+
+
+def _config(thread_id: Any) -> dict:
+    return {"configurable": {"thread_id": str(thread_id)}}
+
+
+def _messages(saved) -> List[Any]:
+    if saved is None:
+        return []
+    return saved.checkpoint["channel_values"].get("messages", [])
+
+
+def load_message_page(
+    graph, thread_id: Any, limit: int = DEFAULT_PAGE_SIZE, before: Optional[int] = None
+) -> Page:
+    return message_page(_messages(graph.checkpointer.get_tuple(_config(thread_id))), limit, before)
+
+
+async def aload_message_page(
+    graph, thread_id: Any, limit: int = DEFAULT_PAGE_SIZE, before: Optional[int] = None
+) -> Page:
+    saved = await graph.checkpointer.aget_tuple(_config(thread_id))
+    return message_page(_messages(saved), limit, before)
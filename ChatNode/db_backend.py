@@ -1,20 +1,24 @@
 from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 from Custom_Chat_Model import EuriChatModel
+from llm_cache import response_cache_from_env
 from typing import TypedDict, Annotated
+from conversation import DEFAULT_PAGE_SIZE, load_message_page
+from checkpointer import make_checkpointer
+from retention import start_compactor
 from dotenv import load_dotenv
-import sqlite3
 import os
 
 load_dotenv()
 
 EURI_API = os.getenv("EURI_API_KEY")
 
+# Responses are cached only when LLM_CACHE_PATH is set
 llm = EuriChatModel(
     model='gpt-4.1-mini',
-    api_key=EURI_API
+    api_key=EURI_API,
+    cache=response_cache_from_env()
     )
 
 # State 
@@ -28,11 +32,18 @@ def chat_node(state : ChatState):
 
     return {'messages' : [response]}
 
-# Sqlite database connection
-conn = sqlite3.connect(database='chatbot.db',check_same_thread=False)
+# Checkpointer: one writer connection plus a pool of WAL readers,
+# storing messages as deltas between periodic full snapshots, zstd-compressed
+checkpointer = make_checkpointer(
+    'chatbot.db',
+    readers=int(os.getenv('CHECKPOINT_READERS', '4')),
+    snapshot_every=int(os.getenv('CHECKPOINT_SNAPSHOT_EVERY', '20')),
+    compress=os.getenv('CHECKPOINT_COMPRESSION', '1') == '1',
+)
+conn = checkpointer.conn
 
-# Checkpointer 
-checkpointer = SqliteSaver(conn=conn)
+# Retention: prune old checkpoints in the background
+compactor = start_compactor(conn, lock=checkpointer.lock)
 
 # Graph
 graph = StateGraph(ChatState)
@@ -47,9 +58,18 @@ graph.add_edge('chat_node',END)
 # Compile graph
 chatbot = graph.compile(checkpointer=checkpointer)
 
-def retrieve_all_threads():
-    thread_ids = set()
-    for checkpoint in checkpointer.list(None):
-        thread_ids.add(checkpoint.config['configurable']['thread_id'])
+def retrieve_all_threads(limit=None, offset=0):
+    # The registry pages newest first; the sidebar appends and renders reversed.
+    threads = checkpointer.list_threads(limit=limit, offset=offset)
 
-    return list(thread_ids)
\ No newline at end of file
+    return [thread['thread_id'] for thread in reversed(threads)]
+
+def retrieve_thread_summaries(limit=None, offset=0):
+    """Sidebar rows (thread_id, title, updated_at, message_count) without loading any state."""
+    threads = checkpointer.list_threads(limit=limit, offset=offset)
+
+    return list(reversed(threads))
+
+def load_messages(thread_id, limit=DEFAULT_PAGE_SIZE, before=None):
+    """Last `limit` messages before the `before` cursor, and the cursor for the page before them."""
+    return load_message_page(chatbot, thread_id, limit, before)
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Persistent exact-match cache for chat model responses.
+
+`SQLiteResponseCache` plugs into LangChain's cache hook (`cache=` on any chat
+model), so it works for `EuriChatModel` and `ChatOpenAI` alike. Entries are
+keyed by a SHA-256 of the canonicalised prompt and LangChain's `llm_string`,
+which together cover the model, its parameters (temperature, ...), the
+messages, bound tools and any structured-output schema. Message ids are
+already dropped from the prompt by LangChain, so replayed conversations hit.
+
+Entries expire after `ttl_seconds`, and once the file holds more than
+`max_bytes` of responses the least recently used ones are evicted.
+
+Caching is opt-in: `response_cache_from_env()` returns a cache only when
+LLM_CACHE_PATH is set (LLM_CACHE_TTL and LLM_CACHE_MAX_MB tune it), and None
+otherwise, which leaves models uncached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, Dict, Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    generations TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used);
+"""
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Hash of the prompt and model settings, independent of JSON key order."""
+    try:
+        prompt = json.dumps(json.loads(prompt), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        pass
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode())
+    digest.update(b"\0")
+    digest.update(prompt.encode())
+    return digest.hexdigest()
+
+
+class SQLiteResponseCache(BaseCache):
+    """LangChain cache backed by a local SQLite file, with TTL and size eviction."""
+
+    def __init__(
+        self,
+        path: str = "llm_cache.db",
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(CACHE_SCHEMA)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # key -> when its miss was seen, to time the call that fills it
+        self._missed_at: Dict[str, float] = {}
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT generations, latency, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self.conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                if len(self._missed_at) > 1024:
+                    # Calls that failed never come back to update().
+                    self._missed_at.clear()
+                self._missed_at[key] = time.perf_counter()
+                return None
+            self.conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            self.saved_seconds += row[1]
+        # `loads` is marked beta and would warn on every hit.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return [loads(generation, allowed_objects="core") for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        generations = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self.lock:
+            started = self._missed_at.pop(key, None)
+            latency = time.perf_counter() - started if started is not None else 0.0
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, generations, len(generations), latency, now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self.conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        (total,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until back under the cap.
+        self.conn.execute(
+            """
+            DELETE FROM llm_responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                    FROM llm_responses
+                )
+                WHERE running > ?
+            )
+            """,
+            (self.max_bytes,),
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_responses")
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        """Hit rate and time saved by this process, plus the cache's current size."""
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "entries": entries,
+                "bytes": size,
+            }
+
+
+def response_cache_from_env() -> Optional[SQLiteResponseCache]:
+    path = os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+    return SQLiteResponseCache(
+        path,
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+    )
@@ -2,17 +2,25 @@ from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Annotated
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_core.tools import tool, BaseTool
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from checkpointer import RegistryAsyncSqliteSaver
+from compressed_serde import compressed_serializer
+from conversation import DEFAULT_PAGE_SIZE, aload_message_page
+from message_deltas import MessageDeltas
+from retention import start_compactor
+from singleflight import coalesce
 from dotenv import load_dotenv
 import aiosqlite
 import requests
 import asyncio
+import os
+import sqlite3
 import threading
+from contextlib import closing
 
 load_dotenv()
 
@@ -47,6 +55,7 @@ search_tool = DuckDuckGoSearchRun(region="us-en")
 
 
 @tool
+@coalesce
 def get_stock_price(symbol: str) -> dict:
     """
     Fetch latest stock price for a given symbol (e.g. 'AAPL', 'TSLA') 
@@ -109,11 +118,27 @@ tool_node = ToolNode(tools) if tools else None
 
 async def _init_checkpointer():
     conn = await aiosqlite.connect(database="chatbot.db")
-    return AsyncSqliteSaver(conn)
+    # New files only; retention.py converts existing ones offline
+    await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    snapshot_every = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "20"))
+    serde = None
+    if os.getenv("CHECKPOINT_COMPRESSION", "1") == "1":
+        # Stored dictionaries are loaded over a blocking connection; newer
+        # ones are read from the file when first needed.
+        with closing(sqlite3.connect("chatbot.db")) as sync_conn:
+            serde = compressed_serializer(sync_conn, "chatbot.db")
+    return RegistryAsyncSqliteSaver(
+        conn,
+        serde=serde,
+        message_deltas=MessageDeltas(snapshot_every) if snapshot_every > 1 else None,
+    )
 
 
 checkpointer = run_async(_init_checkpointer())
 
+# Retention runs on its own blocking connection, off the event loop
+compactor = start_compactor(sqlite3.connect("chatbot.db", check_same_thread=False))
+
 # -------------------
 # 6. Graph
 # -------------------
@@ -133,12 +158,16 @@ chatbot = graph.compile(checkpointer=checkpointer)
 # -------------------
 # 7. Helper
 # -------------------
-async def _alist_threads():
-    all_threads = set()
-    async for checkpoint in checkpointer.alist(None):
-        all_threads.add(checkpoint.config["configurable"]["thread_id"])
-    return list(all_threads)
+async def _alist_threads(limit=None, offset=0):
+    # The registry pages newest first; the sidebar appends and renders reversed.
+    threads = await checkpointer.alist_threads(limit=limit, offset=offset)
+    return [thread["thread_id"] for thread in reversed(threads)]
+
+
+def retrieve_all_threads(limit=None, offset=0):
+    return run_async(_alist_threads(limit, offset))
 
 
-def retrieve_all_threads():
-    return run_async(_alist_threads())
\ No newline at end of file
+def load_messages(thread_id, limit=DEFAULT_PAGE_SIZE, before=None):
+    """Last `limit` messages before the `before` cursor, and the cursor for the page before them."""
+    return run_async(aload_message_page(chatbot, thread_id, limit, before))
\ No newline at end of file
@@ -2,7 +2,7 @@ import queue
 import uuid
 
 import streamlit as st
-from mcp_backend import chatbot, retrieve_all_threads, submit_async_task
+from mcp_backend import chatbot, load_messages, retrieve_all_threads, submit_async_task
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 # =========================== Utilities ===========================
@@ -15,6 +15,7 @@ def reset_chat():
     st.session_state["thread_id"] = thread_id
     add_thread(thread_id)
     st.session_state["message_history"] = []
+    st.session_state["history_cursor"] = None
 
 
 def add_thread(thread_id):
@@ -22,16 +23,23 @@ def add_thread(thread_id):
         st.session_state["chat_threads"].append(thread_id)
 
 
-def load_conversation(thread_id):
-    state = chatbot.get_state(config={"configurable": {"thread_id": thread_id}})
-    # Check if messages key exists in state values, return empty list if not
-    return state.values.get("messages", [])
+def load_conversation(thread_id, before=None):
+    # One page of the thread, newest last, and the cursor for the page before it
+    messages, cursor = load_messages(thread_id, before=before)
+    temp_messages = []
+    for msg in messages:
+        role = "user" if isinstance(msg, HumanMessage) else "assistant"
+        temp_messages.append({"role": role, "content": msg.content})
+    return temp_messages, cursor
 
 
 # ======================= Session Initialization ===================
 if "message_history" not in st.session_state:
     st.session_state["message_history"] = []
 
+if "history_cursor" not in st.session_state:
+    st.session_state["history_cursor"] = None
+
 if "thread_id" not in st.session_state:
     st.session_state["thread_id"] = generate_thread_id()
 
@@ -50,16 +58,19 @@ st.sidebar.header("My Conversations")
 for thread_id in st.session_state["chat_threads"][::-1]:
     if st.sidebar.button(str(thread_id)):
         st.session_state["thread_id"] = thread_id
-        messages = load_conversation(thread_id)
-
-        temp_messages = []
-        for msg in messages:
-            role = "user" if isinstance(msg, HumanMessage) else "assistant"
-            temp_messages.append({"role": role, "content": msg.content})
-        st.session_state["message_history"] = temp_messages
+        st.session_state["message_history"], st.session_state["history_cursor"] = load_conversation(thread_id)
 
 # ============================ Main UI ============================
 
+# Older messages are only loaded on request
+if st.session_state["history_cursor"] is not None:
+    if st.button("Load earlier messages"):
+        earlier, st.session_state["history_cursor"] = load_conversation(
+            st.session_state["thread_id"], before=st.session_state["history_cursor"]
+        )
+        st.session_state["message_history"] = earlier + st.session_state["message_history"]
+        st.rerun()
+
 # Render history
 for message in st.session_state["message_history"]:
     with st.chat_message(message["role"]):
@@ -0,0 +1,108 @@
+"""
+Delta encoding for the `messages` channel of chat checkpoints.
+
+`add_messages` only ever appends a message or two per step, yet every
+checkpoint re-serialises the whole conversation, so storage and write time
+grow quadratically with its length. In delta mode a checkpoint stores its
+messages as a delta against its parent checkpoint:
+
+    {"__message_delta__": {"base": parent_id, "keep": 12,
+                           "replace": [[3, msg]], "append": [msg, msg]}}
+
+meaning "the parent's first `keep` messages, with index 3 replaced, followed
+by `append`". A full list is written every `snapshot_every` checkpoints (and
+whenever the change is not a cheap edit of the parent), so rebuilding any
+checkpoint replays at most `snapshot_every - 1` deltas.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+DELTA_KEY = "__message_delta__"
+
+
+def is_delta(value: Any) -> bool:
+    return isinstance(value, dict) and DELTA_KEY in value
+
+
+def delta_base(value: dict) -> str:
+    return value[DELTA_KEY]["base"]
+
+
+def apply_delta(base: List[Any], value: dict) -> List[Any]:
+    delta = value[DELTA_KEY]
+    messages = base[: delta["keep"]]
+    for index, message in delta["replace"]:
+        messages[index] = message
+    messages.extend(delta["append"])
+    return messages
+
+
+def _diff(previous: List[Any], current: List[Any]) -> Optional[dict]:
+    keep = min(len(previous), len(current))
+    replace = [
+        [index, current[index]]
+        for index in range(keep)
+        if current[index] is not previous[index] and current[index] != previous[index]
+    ]
+    # Rewrites of much of the history (e.g. a removal near the start shifts
+    # everything) are cheaper to store as a snapshot.
+    if len(replace) > max(1, keep // 4):
+        return None
+    return {"keep": keep, "replace": replace, "append": current[keep:]}
+
+
+class MessageDeltas:
+    """
+    Decides, per checkpoint write, between a full message list and a delta.
+
+    Remembers the last written message list of each thread/namespace (for
+    up to `max_threads` threads) so encoding never reads the database; a
+    parent it does not remember gets a full snapshot instead.
+    """
+
+    def __init__(self, snapshot_every: int = 20, max_threads: int = 256):
+        self.snapshot_every = snapshot_every
+        self.max_threads = max_threads
+        # (thread_id, checkpoint_ns) -> (checkpoint_id, messages, deltas since snapshot)
+        self._last: "OrderedDict[Tuple[str, str], Tuple[str, List[Any], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        parent_id: Optional[str],
+        checkpoint_id: str,
+        messages: List[Any],
+    ) -> Tuple[Any, Optional[str]]:
+        """Value to store for `messages`, and the base checkpoint id if it is a delta."""
+        key = (thread_id, checkpoint_ns)
+        with self._lock:
+            last = self._last.get(key)
+            stored: Any = messages
+            base = None
+            depth = 0
+            if last is not None and parent_id is not None and last[0] == parent_id:
+                _, previous, previous_depth = last
+                if previous_depth + 1 < self.snapshot_every:
+                    delta = _diff(previous, messages)
+                    if delta is not None:
+                        delta["base"] = parent_id
+                        stored, base, depth = {DELTA_KEY: delta}, parent_id, previous_depth + 1
+            self._last[key] = (checkpoint_id, messages, depth)
+            self._last.move_to_end(key)
+            while len(self._last) > self.max_threads:
+                self._last.popitem(last=False)
+            return stored, base
+
+    def cached(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> Optional[List[Any]]:
+        """The remembered messages of `checkpoint_id`, if it was the last one written."""
+        with self._lock:
+            last = self._last.get((thread_id, checkpoint_ns))
+            if last is not None and last[0] == checkpoint_id:
+                return last[1]
+            return None
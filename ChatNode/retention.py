@@ -0,0 +1,310 @@
+"""
+Retention and online compaction for the SQLite checkpoint tables.
+
+LangGraph writes a checkpoint per super-step and never deletes one, so
+`chatbot.db` grows without bound. `compact_checkpoints` keeps the latest
+`keep_last` checkpoints of each thread/namespace, plus any checkpoint that
+still has a pending interrupt or that a kept delta-encoded checkpoint is
+rebuilt from, and drops the rest with their writes. It works one thread per
+transaction, so chats keep writing while it runs. In a database with
+auto_vacuum=INCREMENTAL (which `make_checkpointer` sets for new files) the
+freed pages are then returned to the filesystem in small
+`PRAGMA incremental_vacuum` steps; otherwise SQLite reuses them for new
+checkpoints and the file stops growing but does not shrink.
+
+`CheckpointCompactor` runs that on an interval in a daemon thread; the
+backends start one with `start_compactor`.
+
+Converting an existing database to incremental mode takes a full VACUUM
+that rewrites the file under an exclusive lock, so it is never done online.
+Run it with the backends stopped:
+
+    python retention.py chatbot.db --enable-incremental-vacuum
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# A checkpoint is waiting on a human while it has an interrupt write and no
+# resume write yet; deleting it would make the interrupt impossible to answer.
+_PENDING_INTERRUPT = """
+EXISTS (
+    SELECT 1 FROM writes w
+    WHERE w.thread_id = ranked.thread_id
+      AND w.checkpoint_ns = ranked.checkpoint_ns
+      AND w.checkpoint_id = ranked.checkpoint_id
+      AND w.channel = '__interrupt__'
+) AND NOT EXISTS (
+    SELECT 1 FROM writes w
+    WHERE w.thread_id = ranked.thread_id
+      AND w.checkpoint_ns = ranked.checkpoint_ns
+      AND w.checkpoint_id = ranked.checkpoint_id
+      AND w.channel = '__resume__'
+)
+"""
+
+_OVER_LIMIT_THREADS = """
+SELECT DISTINCT thread_id FROM (
+    SELECT thread_id FROM checkpoints
+    GROUP BY thread_id, checkpoint_ns
+    HAVING COUNT(*) > ?
+)
+"""
+
+# Checkpoints the policy keeps, plus (with delta-encoded messages) every
+# checkpoint a kept delta is rebuilt from, back to its full snapshot.
+_KEPT = f"""
+WITH RECURSIVE ranked AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           ROW_NUMBER() OVER (
+               PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC
+           ) AS position
+    FROM checkpoints
+    WHERE thread_id = :thread_id
+), kept (checkpoint_ns, checkpoint_id) AS (
+    SELECT checkpoint_ns, checkpoint_id FROM ranked
+    WHERE position <= :keep_last OR ({_PENDING_INTERRUPT})
+    {{delta_bases}}
+)
+"""
+
+_DELTA_BASES = """
+    UNION
+    SELECT d.checkpoint_ns, d.base_checkpoint_id
+    FROM message_deltas d JOIN kept k
+      ON d.thread_id = :thread_id
+     AND d.checkpoint_ns = k.checkpoint_ns
+     AND d.checkpoint_id = k.checkpoint_id
+"""
+
+_DELETE_CHECKPOINTS = """
+DELETE FROM checkpoints
+WHERE thread_id = :thread_id
+  AND (checkpoint_ns, checkpoint_id) NOT IN (SELECT checkpoint_ns, checkpoint_id FROM kept)
+"""
+
+_DELETE_ORPHAN_DELTAS = """
+DELETE FROM message_deltas
+WHERE thread_id = ? AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = message_deltas.thread_id
+      AND c.checkpoint_ns = message_deltas.checkpoint_ns
+      AND c.checkpoint_id = message_deltas.checkpoint_id
+)
+"""
+
+_DELETE_ORPHAN_WRITES = """
+DELETE FROM writes
+WHERE thread_id = ? AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = writes.thread_id
+      AND c.checkpoint_ns = writes.checkpoint_ns
+      AND c.checkpoint_id = writes.checkpoint_id
+)
+"""
+
+# Pages released per incremental_vacuum step, so no single step holds the
+# write lock for long.
+VACUUM_STEP_PAGES = 1024
+
+
+def _has_checkpoint_tables(conn: sqlite3.Connection) -> bool:
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('checkpoints', 'writes')"
+    ).fetchall()
+    return len(rows) == 2
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _pragma(conn: sqlite3.Connection, name: str) -> int:
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Switch the database to auto_vacuum=INCREMENTAL.
+
+    Databases created without it need one full VACUUM to change mode, which
+    rewrites the file and blocks every other connection until it is done, so
+    only call this while nothing else is using the database. Returns True if
+    that conversion ran.
+    """
+    if _pragma(conn, "auto_vacuum") == 2:
+        return False
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def compact_checkpoints(
+    conn: sqlite3.Connection,
+    keep_last: int = 20,
+    lock: Optional[Any] = None,
+    vacuum: bool = True,
+) -> Dict[str, Any]:
+    """
+    Apply the retention policy once and report what it removed.
+
+    `lock` is the checkpointer's lock when `conn` is shared with it; each
+    thread's deletes run in their own short transaction under it. With
+    `vacuum`, free pages are released only if the database is already in
+    auto_vacuum=INCREMENTAL mode.
+    """
+    if keep_last < 1:
+        raise ValueError("keep_last must be at least 1")
+    started = time.perf_counter()
+    lock = lock or nullcontext()
+    report = {"threads": 0, "checkpoints_deleted": 0, "writes_deleted": 0, "bytes_reclaimed": 0}
+
+    with lock:
+        if not _has_checkpoint_tables(conn):
+            report["seconds"] = time.perf_counter() - started
+            return report
+        thread_ids = [row[0] for row in conn.execute(_OVER_LIMIT_THREADS, (keep_last,))]
+        has_deltas = _has_table(conn, "message_deltas")
+    delete_checkpoints = _KEPT.format(delta_bases=_DELTA_BASES if has_deltas else "") + _DELETE_CHECKPOINTS
+
+    for thread_id in thread_ids:
+        with lock:
+            try:
+                # rowcount is -1 for statements starting with WITH.
+                changes = conn.total_changes
+                conn.execute(delete_checkpoints, {"thread_id": thread_id, "keep_last": keep_last})
+                checkpoints = conn.total_changes - changes
+                writes = conn.execute(_DELETE_ORPHAN_WRITES, (thread_id,)).rowcount
+                if has_deltas:
+                    conn.execute(_DELETE_ORPHAN_DELTAS, (thread_id,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        report["threads"] += 1
+        report["checkpoints_deleted"] += checkpoints
+        report["writes_deleted"] += writes
+
+    with lock:
+        incremental = _pragma(conn, "auto_vacuum") == 2
+    if vacuum and incremental:
+        with lock:
+            page_size = _pragma(conn, "page_size")
+            pages_before = _pragma(conn, "page_count")
+        free_pages = None
+        while True:
+            with lock:
+                remaining = _pragma(conn, "freelist_count")
+                if remaining == 0 or remaining == free_pages:
+                    break
+                free_pages = remaining
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+                conn.commit()
+        with lock:
+            report["bytes_reclaimed"] = (pages_before - _pragma(conn, "page_count")) * page_size
+
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+class CheckpointCompactor:
+    """
+    Daemon thread that runs `compact_checkpoints` every `interval_seconds`.
+
+    Pass the checkpointer's own connection and lock (SqliteSaver.conn/.lock)
+    to share it, or a separate connection to the same file.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        keep_last: int = 20,
+        interval_seconds: float = 600.0,
+        lock: Optional[Any] = None,
+    ):
+        self.conn = conn
+        self.keep_last = keep_last
+        self.interval_seconds = interval_seconds
+        self.lock = lock
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.total_bytes_reclaimed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, Any]:
+        report = compact_checkpoints(self.conn, self.keep_last, lock=self.lock)
+        self.last_report = report
+        self.total_bytes_reclaimed += report["bytes_reclaimed"]
+        if report["checkpoints_deleted"]:
+            logger.info(
+                "Compacted %d threads: %d checkpoints, %d writes, %d bytes reclaimed in %.2fs",
+                report["threads"],
+                report["checkpoints_deleted"],
+                report["writes_deleted"],
+                report["bytes_reclaimed"],
+                report["seconds"],
+            )
+        return report
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Checkpoint compaction failed")
+
+    def start(self) -> "CheckpointCompactor":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="checkpoint-compactor", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact a checkpoint database once.")
+    parser.add_argument("db", help="checkpoint database, e.g. chatbot.db")
+    parser.add_argument("--keep-last", type=int, default=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")))
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="convert to auto_vacuum=INCREMENTAL first (full VACUUM; stop the backends)",
+    )
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.enable_incremental_vacuum and enable_incremental_vacuum(conn):
+        print("Converted to auto_vacuum=INCREMENTAL")
+    print(compact_checkpoints(conn, args.keep_last))
+
+
+def start_compactor(conn: sqlite3.Connection, lock: Optional[Any] = None) -> CheckpointCompactor:
+    """Background compactor configured from CHECKPOINT_KEEP_LAST / CHECKPOINT_COMPACT_INTERVAL."""
+    return CheckpointCompactor(
+        conn,
+        keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")),
+        interval_seconds=float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "600")),
+        lock=lock,
+    ).start()
+
+
+if __name__ == "__main__":
+    main()
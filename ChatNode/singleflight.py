@@ -0,0 +1,280 @@
+"""
+Coalescing of concurrent identical calls ("singleflight").
+
+While a call for a key is in flight, further calls for the same key wait
+for it instead of going upstream themselves, then receive a copy of its
+result (or its exception). Nothing is kept once the call finishes, so this
+never serves stale results; it only removes duplicates that overlap in time.
+A caller that gives up (a cancelled task, a stream closed early) only stops
+waiting; the shared call carries on for the others.
+
+    flights = SingleFlight()
+    result = flights.do(key, lambda: requests.get(url).json())
+    result = await flights.ado(key, lambda: client.get(url))
+
+`stream` / `astream` do the same for iterators: a background thread (or
+task) consumes the upstream stream and every caller, the first one included,
+replays the chunks as they arrive. Upstream is closed early only once every
+caller has stopped.
+Sync and async calls are coalesced separately, async ones per event loop.
+
+`coalesce` applies this to a function (sync or async), keyed on its
+arguments, and is meant to sit under `@tool`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+
+def flight_key(*parts: Any) -> str:
+    """Stable hash of JSON-able `parts` (other values fall back to repr)."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class _StreamCall:
+    def __init__(self, condition):
+        self.condition = condition
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: BaseException | None = None
+        # Callers replaying this stream that haven't stopped yet
+        self.consumers = 0
+        # The task reading upstream, held so it isn't garbage collected
+        self.pump: Any = None
+
+
+class StreamAbandoned(RuntimeError):
+    """The upstream stream was stopped before it ended."""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._async_streams: Dict[Tuple[int, str], _StreamCall] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced}
+
+    def _join(self, calls: dict, key, make):
+        """Return (call, is_leader) for `key`, registering a new call if none is in flight."""
+        with self._lock:
+            self.calls += 1
+            call = calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = calls[key] = make()
+                leader = True
+            if isinstance(call, _StreamCall):
+                call.consumers += 1
+            return call, leader
+
+    def _leave(self, calls: dict, key, call) -> None:
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+
+    def _abandoned(self, calls: dict, key, call: _StreamCall) -> bool:
+        """True, and `key` is free for a new call, once every consumer has stopped."""
+        with self._lock:
+            if call.consumers:
+                return False
+            if calls.get(key) is call:
+                del calls[key]
+            return True
+
+    def _stop_consuming(self, call: _StreamCall) -> None:
+        with self._lock:
+            call.consumers -= 1
+
+    # ------------------------------ threads ------------------------------
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        call, leader = self._join(self._calls, key, _Call)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            self._leave(self._calls, key, call)
+            call.done.set()
+
+    def stream(self, key: str, fn: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        call, leader = self._join(self._streams, key, lambda: _StreamCall(threading.Condition()))
+        if leader:
+            # Upstream is read on its own thread, so no caller, the first one
+            # included, can cut the others off by stopping early.
+            threading.Thread(target=self._pump, args=(key, call, fn), daemon=True).start()
+        return self._replay(call, leader)
+
+    def _pump(self, key: str, call: _StreamCall, fn) -> None:
+        upstream = None
+        try:
+            upstream = iter(fn())
+            for chunk in upstream:
+                if self._abandoned(self._streams, key, call):
+                    call.error = StreamAbandoned()
+                    break
+                with call.condition:
+                    call.chunks.append(chunk)
+                    call.condition.notify_all()
+        except BaseException as exc:
+            call.error = exc if isinstance(exc, Exception) else StreamAbandoned()
+        finally:
+            if hasattr(upstream, "close"):
+                upstream.close()
+            self._leave(self._streams, key, call)
+            with call.condition:
+                call.finished = True
+                call.condition.notify_all()
+
+    def _replay(self, call: _StreamCall, leader: bool) -> Iterator[Any]:
+        index = 0
+        try:
+            while True:
+                with call.condition:
+                    call.condition.wait_for(lambda: len(call.chunks) > index or call.finished)
+                    pending = call.chunks[index:]
+                    finished, error = call.finished, call.error
+                for chunk in pending:
+                    yield chunk if leader else copy.deepcopy(chunk)
+                index += len(pending)
+                if finished and index == len(call.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self._stop_consuming(call)
+
+    # ------------------------------ asyncio ------------------------------
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight = (id(loop), key)
+        task, leader = self._join(self._async_calls, flight, lambda: asyncio.ensure_future(fn()))
+        if leader:
+            task.add_done_callback(functools.partial(self._adone, flight))
+        # The call runs in its own task and every caller awaits it through
+        # shield, so cancelling any of them, the first one included, leaves
+        # it running for the rest.
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+    def _adone(self, flight, task: asyncio.Future) -> None:
+        self._leave(self._async_calls, flight, task)
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller was cancelled.
+            task.exception()
+
+    def astream(self, key: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        flight = (id(loop), key)
+        call, leader = self._join(self._async_streams, flight, lambda: _StreamCall(asyncio.Condition()))
+        if leader:
+            call.pump = loop.create_task(self._apump(flight, call, fn))
+        return self._areplay(call, leader)
+
+    async def _apump(self, flight, call: _StreamCall, fn) -> None:
+        upstream = None
+        try:
+            upstream = fn()
+            async for chunk in upstream:
+                if self._abandoned(self._async_streams, flight, call):
+                    call.error = StreamAbandoned()
+                    break
+                async with call.condition:
+                    call.chunks.append(chunk)
+                    call.condition.notify_all()
+        except BaseException as exc:
+            call.error = exc if isinstance(exc, Exception) else StreamAbandoned()
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            if hasattr(upstream, "aclose"):
+                await upstream.aclose()
+            self._leave(self._async_streams, flight, call)
+            async with call.condition:
+                call.finished = True
+                call.condition.notify_all()
+
+    async def _areplay(self, call: _StreamCall, leader: bool) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                async with call.condition:
+                    await call.condition.wait_for(lambda: len(call.chunks) > index or call.finished)
+                    pending = call.chunks[index:]
+                    finished, error = call.finished, call.error
+                for chunk in pending:
+                    yield chunk if leader else copy.deepcopy(chunk)
+                index += len(pending)
+                if finished and index == len(call.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self._stop_consuming(call)
+
+
+_default = SingleFlight()
+
+
+def coalesce(fn=None, *, flights: SingleFlight = _default):
+    """
+    Decorator coalescing concurrent calls of `fn` with equal arguments.
+    Works on sync and async functions and keeps their signature and
+    docstring, so `@tool` above it builds the same tool schema.
+    """
+    if fn is None:
+        return functools.partial(coalesce, flights=flights)
+
+    signature = inspect.signature(fn)
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    def key(args, kwargs) -> str:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return flight_key(name, bound.arguments)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            return await flights.ado(key(args, kwargs), lambda: fn(*args, **kwargs))
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return flights.do(key(args, kwargs), lambda: fn(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,122 @@
+"""
+Byte-level parser for the chat completion event stream.
+
+Works on the raw bytes as they come off the socket instead of decoded
+lines: events are split on blank lines (LF or CRLF), `data:` lines of one
+event are joined with newlines as the SSE spec asks, and an event or line
+cut across network chunks is held until the rest arrives. Bare JSON lines
+without a `data:` prefix are accepted as one-line events.
+
+Only events that can carry text are decoded: payloads without a
+`"content"` key (role announcements, finish reasons, usage) are skipped
+without JSON parsing, and parsing uses orjson when it is installed.
+"""
+
+from __future__ import annotations
+
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover - orjson is optional
+    from json import loads as json_loads
+
+DONE = b"[DONE]"
+_CONTENT = b'"content"'
+
+
+class SSEParser:
+    """Incremental parser: `feed` raw bytes, get back the complete event payloads."""
+
+    __slots__ = ("_pending", "_data")
+
+    def __init__(self):
+        # Pieces of a line not yet terminated by a newline
+        self._pending: List[bytes] = []
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        if b"\n" not in chunk:
+            if chunk:
+                self._pending.append(chunk)
+            return []
+        if self._pending:
+            self._pending.append(chunk)
+            chunk = b"".join(self._pending)
+            self._pending.clear()
+        lines = chunk.split(b"\n")
+        # The last piece has no newline yet; keep it for the next chunk.
+        tail = lines.pop()
+        if tail:
+            self._pending.append(tail)
+        events = []
+        data = self._data
+        for line in lines:
+            if line[-1:] == b"\r":
+                line = line[:-1]
+            if not line:
+                if data:
+                    events.append(data[0] if len(data) == 1 else b"\n".join(data))
+                    data.clear()
+            elif line[:5] == b"data:":
+                data.append(line[6:] if line[5:6] == b" " else line[5:])
+            elif line[:1] == b"{":
+                events.append(line)
+            # Comments (":") and other fields (event, id, retry) are ignored.
+        return events
+
+    def close(self) -> List[bytes]:
+        """Payloads left when the stream ends without a final blank line."""
+        return self.feed(b"\n\n") if self._pending or self._data else []
+
+
+def content_delta(payload: bytes) -> Optional[str]:
+    """Text of one completion event, or None if it carries none."""
+    if _CONTENT not in payload:
+        return None
+    try:
+        event = json_loads(payload)
+    except ValueError:
+        return None
+    choices = event.get("choices") if isinstance(event, dict) else None
+    if not choices:
+        return None
+    delta = choices[0].get("delta")
+    if not delta:
+        return None
+    return delta.get("content") or None
+
+
+def stream_text(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Text deltas of a completion stream, from its raw byte chunks."""
+    parser = SSEParser()
+    for chunk in chunks:
+        for payload in parser.feed(chunk):
+            if payload == DONE:
+                return
+            content = content_delta(payload)
+            if content is not None:
+                yield content
+    for payload in parser.close():
+        if payload == DONE:
+            return
+        content = content_delta(payload)
+        if content is not None:
+            yield content
+
+
+async def astream_text(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    parser = SSEParser()
+    async for chunk in chunks:
+        for payload in parser.feed(chunk):
+            if payload == DONE:
+                return
+            content = content_delta(payload)
+            if content is not None:
+                yield content
+    for payload in parser.close():
+        if payload == DONE:
+            return
+        content = content_delta(payload)
+        if content is not None:
+            yield content
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark for the completion stream parser.
+
+Replays recorded event streams (raw response bodies, e.g. saved with
+`curl -N ... > reply.sse`) through the old line-based parsing of `_stream`
+(`iter_lines(decode_unicode=True)` plus `json.loads` per line) and through
+the byte-level parser in sse.py, cut into network-sized chunks:
+
+    python sse_benchmark.py reply.sse other.sse --chunk-bytes 256
+
+Without files a synthetic stream of --tokens tokens is replayed. Reports the
+parse time per token and checks both parsers produce the same text.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import time
+from typing import Callable, Iterator, List
+
+import requests
+
+from sse import stream_text
+
+
+def synthetic_stream(tokens: int) -> bytes:
+    events = [b'data: {"id":"c1","object":"chat.completion.chunk","choices":[{"index":0,"delta":{"role":"assistant"}}]}\n\n']
+    for i in range(tokens):
+        event = {
+            "id": "c1",
+            "object": "chat.completion.chunk",
+            "model": "gpt-4.1-mini",
+            "choices": [{"index": 0, "delta": {"content": f" token{i}"}, "finish_reason": None}],
+        }
+        events.append(b"data: " + json.dumps(event).encode() + b"\n\n")
+    events.append(b'data: {"id":"c1","choices":[{"index":0,"delta":{},"finish_reason":"stop"}]}\n\n')
+    events.append(b"data: [DONE]\n\n")
+    return b"".join(events)
+
+
+def line_based(body: bytes, chunk_bytes: int) -> Iterator[str]:
+    """The parsing `_stream` did before sse.py, on a replayed response."""
+    response = requests.Response()
+    response.raw = io.BytesIO(body)
+    response.encoding = "utf-8"
+    for line in response.iter_lines(chunk_size=chunk_bytes, decode_unicode=True):
+        if not line:
+            continue
+        if line.startswith("data:"):
+            line = line[len("data:"):].strip()
+        if line == "[DONE]":
+            break
+        try:
+            chunk = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        choices = chunk.get("choices")
+        if not choices:
+            continue
+        content = choices[0].get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+def byte_based(body: bytes, chunk_bytes: int) -> Iterator[str]:
+    return stream_text(body[i:i + chunk_bytes] for i in range(0, len(body), chunk_bytes))
+
+
+def measure(parse: Callable[[bytes, int], Iterator[str]], bodies: List[bytes], chunk_bytes: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        texts = ["".join(parse(body, chunk_bytes)) for body in bodies]
+        best = min(best, time.perf_counter() - started)
+    return best, texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recordings", nargs="*", help="raw SSE response bodies to replay")
+    parser.add_argument("--tokens", type=int, default=2000, help="tokens in the synthetic stream")
+    parser.add_argument("--chunk-bytes", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    bodies = []
+    for path in args.recordings:
+        with open(path, "rb") as f:
+            bodies.append(f.read())
+    if not bodies:
+        bodies = [synthetic_stream(args.tokens)]
+
+    results = {}
+    for name, parse in (("lines", line_based), ("bytes", byte_based)):
+        results[name] = measure(parse, bodies, args.chunk_bytes, args.repeat)
+    if results["lines"][1] != results["bytes"][1]:
+        raise SystemExit("Parsers disagree on the streamed text")
+
+    tokens = sum(1 for body in bodies for _ in byte_based(body, args.chunk_bytes))
+    size = sum(len(body) for body in bodies)
+    print(f"{len(bodies)} stream(s), {tokens} tokens, {size} bytes, {args.chunk_bytes}-byte chunks\n")
+    print(f"{'parser':<8}{'total ms':>10}{'us/token':>10}{'MB/s':>8}")
+    for name, (seconds, _) in results.items():
+        print(f"{name:<8}{seconds * 1000:>10.2f}{seconds * 1e6 / tokens:>10.2f}{size / seconds / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_community.tools import DuckDuckGoSearchRun
@@ -7,8 +6,11 @@ from langchain_core.messages import BaseMessage
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from typing import TypedDict, Annotated
+from conversation import DEFAULT_PAGE_SIZE, load_message_page
+from checkpointer import make_checkpointer
+from retention import start_compactor
+from singleflight import coalesce
 from dotenv import load_dotenv
-import sqlite3
 import os
 import requests
 
@@ -48,6 +50,7 @@ def calculator(first_num : float, second_num : float, operation : str) -> dict:
         return {'error' : str(e)}
     
 @tool
+@coalesce
 def get_stock_price(symbol : str) -> dict:
     """
     Fetch latest stock price for a given symbol using Alpha vantage API.
@@ -74,11 +77,18 @@ def chat_node(state : ChatState):
 
 tool_node = ToolNode(tools)
 
-# Sqlite database connection
-conn = sqlite3.connect(database='chatbot.db',check_same_thread=False)
+# Checkpointer: one writer connection plus a pool of WAL readers,
+# storing messages as deltas between periodic full snapshots, zstd-compressed
+checkpointer = make_checkpointer(
+    'chatbot.db',
+    readers=int(os.getenv('CHECKPOINT_READERS', '4')),
+    snapshot_every=int(os.getenv('CHECKPOINT_SNAPSHOT_EVERY', '20')),
+    compress=os.getenv('CHECKPOINT_COMPRESSION', '1') == '1',
+)
+conn = checkpointer.conn
 
-# Checkpointer 
-checkpointer = SqliteSaver(conn=conn)
+# Retention: prune old checkpoints in the background
+compactor = start_compactor(conn, lock=checkpointer.lock)
 
 # Graph
 graph = StateGraph(ChatState)
@@ -95,9 +105,18 @@ graph.add_edge('tools','chat_node')
 # Compile graph
 chatbot = graph.compile(checkpointer=checkpointer)
 
-def retrieve_all_threads():
-    thread_ids = set()
-    for checkpoint in checkpointer.list(None):
-        thread_ids.add(checkpoint.config['configurable']['thread_id'])
+def retrieve_all_threads(limit=None, offset=0):
+    # The registry pages newest first; the sidebar appends and renders reversed.
+    threads = checkpointer.list_threads(limit=limit, offset=offset)
 
-    return list(thread_ids)
\ No newline at end of file
+    return [thread['thread_id'] for thread in reversed(threads)]
+
+def retrieve_thread_summaries(limit=None, offset=0):
+    """Sidebar rows (thread_id, title, updated_at, message_count) without loading any state."""
+    threads = checkpointer.list_threads(limit=limit, offset=offset)
+
+    return list(reversed(threads))
+
+def load_messages(thread_id, limit=DEFAULT_PAGE_SIZE, before=None):
+    """Last `limit` messages before the `before` cursor, and the cursor for the page before them."""
+    return load_message_page(chatbot, thread_id, limit, before)
\ No newline at end of file
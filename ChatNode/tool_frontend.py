@@ -1,5 +1,5 @@
 import streamlit as st
-from tool_backend import chatbot, retrieve_all_threads
+from tool_backend import chatbot, load_messages, retrieve_thread_summaries
 from langchain_core.messages import HumanMessage, AIMessage
 import uuid
 
@@ -13,6 +13,7 @@ def new_chat():
     st.session_state['thread_id'] = thread_id
     add_thread(thread_id, title="New Chat")
     st.session_state['message_history'] = []
+    st.session_state['history_cursor'] = None
 
 def add_thread(thread_id, title="New Chat"):
     for thread in st.session_state['chat_threads']:
@@ -24,12 +25,19 @@ def add_thread(thread_id, title="New Chat"):
         'title': title
     })
 
-def load_conversation(thread_id):
-    state = chatbot.get_state(
-        config={'configurable': {'thread_id': thread_id}}
-    )
+def load_conversation(thread_id, before=None):
+    # One page of the thread, newest last, and the cursor for the page before it
+    messages, cursor = load_messages(thread_id, before=before)
 
-    return state.values.get('messages', [])
+    temp_messages = []
+    for message in messages:
+        role = 'user' if isinstance(message, HumanMessage) else 'assistant'
+        temp_messages.append({
+            'role': role,
+            'content': message.content
+        })
+
+    return temp_messages, cursor
 
 def generate_chat_title(message, max_len=40):
     return message[:max_len] + "..." if len(message) > max_len else message
@@ -39,27 +47,21 @@ def generate_chat_title(message, max_len=40):
 if 'message_history' not in st.session_state:
     st.session_state['message_history'] = []
 
+if 'history_cursor' not in st.session_state:
+    st.session_state['history_cursor'] = None
+
 if 'thread_id' not in st.session_state:
     st.session_state['thread_id'] = generate_thread_id()
 
 if 'chat_threads' not in st.session_state:
     st.session_state['chat_threads'] = []
 
-    for thread_id in retrieve_all_threads():
-        messages = chatbot.get_state(
-            config={'configurable': {'thread_id': thread_id}}
-        ).values.get('messages', [])
-
-        # Generate title from first user message
-        title = "New Chat"
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                title = generate_chat_title(msg.content)
-                break
-
+    # Titles and summaries come precomputed from the thread registry
+    for thread in retrieve_thread_summaries():
         st.session_state['chat_threads'].append({
-            "thread_id": thread_id,
-            "title": title
+            "thread_id": thread['thread_id'],
+            "title": thread['title'] or "New Chat",
+            "summary": f"{thread['message_count']} messages · last active {thread['updated_at'][:16].replace('T', ' ')}"
         })
 
     # [
@@ -81,22 +83,21 @@ if st.sidebar.button("New Chat"):
 st.sidebar.header("Your Chats")
 
 for thread in st.session_state['chat_threads'][::-1]:
-    if st.sidebar.button(thread['title'], key=str(thread['thread_id'])):
+    if st.sidebar.button(thread['title'], key=str(thread['thread_id']), help=thread.get('summary')):
         st.session_state['thread_id'] = thread['thread_id']
-        messages = load_conversation(thread['thread_id'])
-
-        temp_messages = []
-        for message in messages:
-            role = 'user' if isinstance(message, HumanMessage) else 'assistant'
-            temp_messages.append({
-                'role': role,
-                'content': message.content
-            })
-        
-        st.session_state['message_history'] = temp_messages
+        st.session_state['message_history'], st.session_state['history_cursor'] = load_conversation(thread['thread_id'])
 
 # *************************************************** Main UI ***************************************************
 
+# Older messages are only loaded on request
+if st.session_state['history_cursor'] is not None:
+    if st.button("Load earlier messages"):
+        earlier, st.session_state['history_cursor'] = load_conversation(
+            st.session_state['thread_id'], before=st.session_state['history_cursor']
+        )
+        st.session_state['message_history'] = earlier + st.session_state['message_history']
+        st.rerun()
+
 # Loading the conversation history
 for message in st.session_state['message_history']:
     with st.chat_message(message['role']):
@@ -1,7 +1,11 @@
 from langgraph.graph import START, END, StateGraph
-from langgraph.checkpoint.memory import InMemorySaver
 from typing import TypedDict
 import time
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from bounded_memory import BoundedMemorySaver  # noqa: E402
 
 # Define State
 class CrashState(TypedDict):
@@ -40,7 +44,7 @@ graph.add_edge('step_2','step_3')
 graph.add_edge('step_3',END)
 
 # Checkpointer
-checkpointer = InMemorySaver()
+checkpointer = BoundedMemorySaver()
 
 # Compile the graph
 workflow = graph.compile(checkpointer=checkpointer)
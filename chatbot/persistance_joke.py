@@ -1,8 +1,12 @@
 from langgraph.graph import START, END, StateGraph
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import InMemorySaver
 from typing import TypedDict
 from dotenv import load_dotenv
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from bounded_memory import BoundedMemorySaver  # noqa: E402
 
 load_dotenv()
 
@@ -40,7 +44,7 @@ graph.add_edge('generate_joke','generate_explanation')
 graph.add_edge('generate_explanation',END)
 
 # Checkpointer 
-checkpointer = InMemorySaver()
+checkpointer = BoundedMemorySaver()
 
 # Compile the graph
 workflow = graph.compile(checkpointer=checkpointer)
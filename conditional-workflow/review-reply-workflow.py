@@ -3,10 +3,17 @@ from langchain_openai import ChatOpenAI
 from typing import TypedDict, Literal
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from llm_cache import response_cache_from_env  # noqa: E402
 
 load_dotenv()
 
-model = ChatOpenAI(model='gpt-4o-mini')
+# Opt-in response cache for reprocessing runs (set LLM_CACHE_PATH)
+llm_cache = response_cache_from_env()
+model = ChatOpenAI(model='gpt-4o-mini',cache=llm_cache)
 
 # Define the schema for sentiment classification
 class SentimentSchema(BaseModel):
@@ -95,6 +102,9 @@ final_state = workflow.invoke(initial_state)
 
 print(final_state)
 
+if llm_cache is not None:
+    print(llm_cache.stats())
+
 png_bytes = workflow.get_graph().draw_mermaid_png()
 
 output_file = "conditional-workflow/review-reply-workflow.png"
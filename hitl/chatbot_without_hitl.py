@@ -4,13 +4,16 @@ from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Annotated
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 import requests
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from bounded_memory import BoundedMemorySaver  # noqa: E402
 
 load_dotenv()
 
@@ -67,8 +70,8 @@ def chat_node(state: ChatState):
 
 tool_node = ToolNode(tools)
 
-# 5. Checkpointer (in-memory)
-memory = MemorySaver()
+# 5. Checkpointer (in-memory, least recently used threads spill to disk)
+memory = BoundedMemorySaver(max_bytes=64 * 1024 * 1024, spill_path="hitl_without_spill.db")
 
 # 6. Graph
 graph = StateGraph(ChatState)
@@ -87,7 +90,7 @@ if __name__ == "__main__":
     print("📈 Stock Bot with Tools (get_stock_price, purchase_stock)")
     print("Type 'exit' to quit.\n")
 
-    # thread_id still works with MemorySaver (conversation kept in RAM)
+    # thread_id still works with BoundedMemorySaver (conversation kept in RAM)
     thread_id = "demo-thread"
 
     while True:
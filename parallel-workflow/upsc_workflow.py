@@ -4,10 +4,17 @@ from typing import TypedDict, Annotated
 from pydantic import BaseModel, Field
 import operator
 from dotenv import load_dotenv
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from llm_cache import response_cache_from_env  # noqa: E402
 
 load_dotenv()
 
-model = ChatOpenAI(model='gpt-4o-mini')
+# Opt-in response cache for reprocessing runs (set LLM_CACHE_PATH)
+llm_cache = response_cache_from_env()
+model = ChatOpenAI(model='gpt-4o-mini',cache=llm_cache)
 
 class EvaluationSchema(BaseModel):
     feedback : str = Field(description="Detailed feedback for the essay")
@@ -107,4 +114,7 @@ with open(output_file, "wb") as f:
 
 final_state = workflow.invoke(initial_state)
 
-print(final_state)
\ No newline at end of file
+print(final_state)
+
+if llm_cache is not None:
+    print(llm_cache.stats())
\ No newline at end of file
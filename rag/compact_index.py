@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import math
+
+import faiss
+import numpy as np
+
+# Supported RAG_INDEX_TYPE values, from largest to smallest per vector:
+#   flat   float32 vectors (what FAISS.from_documents builds), 4 bytes/dim
+#   fp16   scalar-quantized to half floats, 2 bytes/dim, near-lossless
+#   sq8    scalar-quantized to 8 bits per dim, 1 byte/dim
+#   ivfpq  IVF coarse quantizer + product quantization, `pq_m` bytes/vector
+INDEX_TYPES = ("flat", "fp16", "sq8", "ivfpq")
+
+# 8-bit PQ trains 256 centroids per sub-quantizer, so it needs that many points.
+_PQ_MIN_VECTORS = 256
+
+
+def index_type(index) -> str:
+    """Name of the INDEX_TYPES entry an existing FAISS index corresponds to."""
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+            return "fp16"
+        return "sq8"
+    return "flat"
+
+
+def target_type(requested: str, n_vectors: int, ivf_min_vectors: int) -> str:
+    """IVF-PQ needs enough vectors to train; smaller indexes fall back to sq8."""
+    if requested not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {requested!r}; expected one of {INDEX_TYPES}")
+    if requested == "ivfpq" and n_vectors < max(ivf_min_vectors, _PQ_MIN_VECTORS):
+        return "sq8"
+    return requested
+
+
+def _pq_subquantizers(dim: int, requested: int) -> int:
+    # PQ needs the dimension to split evenly into sub-vectors.
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(
+    vectors: np.ndarray, kind: str, pq_m: int = 64, nprobe: int = 16
+) -> faiss.Index:
+    """Train (if needed) and fill an L2 index of the given type."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    elif kind == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+    elif kind == "ivfpq":
+        # ~4 * sqrt(n) lists, keeping the ~39 training points per list FAISS wants.
+        nlist = max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim, pq_m), 8)
+        index.nprobe = min(nprobe, nlist)
+    else:
+        raise ValueError(f"Unknown index type {kind!r}; expected one of {INDEX_TYPES}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def all_vectors(index) -> np.ndarray:
+    """Reconstruct every stored vector (exact for flat, decoded otherwise)."""
+    if isinstance(index, faiss.IndexIVF):
+        # The direct map blocks remove_ids, so it only lives for the reconstruct.
+        index.make_direct_map()
+        try:
+            return index.reconstruct_n(0, index.ntotal)
+        finally:
+            index.make_direct_map(False)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def index_bytes(index) -> int:
+    return int(faiss.serialize_index(index).size)
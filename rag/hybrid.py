@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Keeps part numbers, error codes and versions ("PN-3-4", "E204", "v1.2") whole.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index over chunk texts scored with Okapi BM25.
+
+    Postings map each term to {chunk_id: term frequency}, so exact-term
+    lookups only touch the chunks that contain the query terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def add(self, chunk_id: str, text: str) -> None:
+        terms = tokenize(text)
+        self.remove([chunk_id])
+        for term, freq in Counter(terms).items():
+            self.postings[term][chunk_id] = freq
+        self.lengths[chunk_id] = len(terms)
+        self.total_length += len(terms)
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        removed = {chunk_id for chunk_id in chunk_ids if chunk_id in self.lengths}
+        if not removed:
+            return
+        for chunk_id in removed:
+            self.total_length -= self.lengths.pop(chunk_id)
+        for term in list(self.postings):
+            posting = self.postings[term]
+            for chunk_id in removed & posting.keys():
+                del posting[chunk_id]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        if not self.lengths:
+            return []
+        n_chunks = len(self.lengths)
+        avg_length = self.total_length / n_chunks
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_chunks - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, freq in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state["postings"] = dict(self.postings)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.postings = defaultdict(dict, self.postings)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists by summing 1 / (k + rank) across lists."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_fusion(
+    vector_hits: Sequence[Tuple[str, float]],
+    keyword_hits: Sequence[Tuple[str, float]],
+    alpha: float = 0.5,
+) -> List[Tuple[str, float]]:
+    """
+    Fuse min-max normalised scores as alpha * vector + (1 - alpha) * BM25.
+
+    Vector hits carry L2 distances (lower is better); BM25 hits carry scores.
+    """
+
+    def normalise(hits: Sequence[Tuple[str, float]], invert: bool) -> Dict[str, float]:
+        if not hits:
+            return {}
+        values = [-score if invert else score for _, score in hits]
+        low, high = min(values), max(values)
+        span = (high - low) or 1.0
+        return {item: (value - low) / span for (item, _), value in zip(hits, values)}
+
+    vector_scores = normalise(vector_hits, invert=True)
+    keyword_scores = normalise(keyword_hits, invert=False)
+    scores = {
+        item: alpha * vector_scores.get(item, 0.0)
+        + (1 - alpha) * keyword_scores.get(item, 0.0)
+        for item in vector_scores.keys() | keyword_scores.keys()
+    }
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever that fuses FAISS similarity search with BM25 keyword search.
+
+    `fusion` is "rrf" (reciprocal rank fusion) or "weighted"; without a
+    keyword index it behaves like plain similarity search. When `lock` is
+    set, index reads hold it so a concurrent ingestion can keep appending.
+    """
+
+    vector_store: Any
+    keyword_index: Optional[BM25Index] = None
+    k: int = 4
+    fetch_k: int = 20
+    fusion: str = "rrf"
+    alpha: float = 0.5
+    lock: Any = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        query_vector = self.vector_store.embeddings.embed_query(query)
+        return self.search_by_vector(query, query_vector)
+
+    def search_by_vector(self, query: str, query_vector: List[float]) -> List[Document]:
+        with self.lock or nullcontext():
+            vector_hits = self.vector_store.similarity_search_with_score_by_vector(
+                query_vector, k=self.fetch_k
+            )
+            if self.keyword_index is None:
+                return [doc for doc, _ in vector_hits[: self.k]]
+            keyword_hits = self.keyword_index.search(query, self.fetch_k)
+
+            by_id = {doc.id: doc for doc, _ in vector_hits}
+            vector_ranked = [(doc.id, score) for doc, score in vector_hits]
+            if self.fusion == "weighted":
+                fused = weighted_fusion(vector_ranked, keyword_hits, self.alpha)
+            else:
+                fused = reciprocal_rank_fusion(
+                    [[item for item, _ in vector_ranked], [item for item, _ in keyword_hits]]
+                )
+
+            results = []
+            for chunk_id, _ in fused[: self.k]:
+                doc = by_id.get(chunk_id) or self.vector_store.docstore.search(chunk_id)
+                if isinstance(doc, Document):
+                    results.append(doc)
+            return results
@@ -0,0 +1,113 @@
+"""
+Recall-versus-memory report for the RAG_INDEX_TYPE options.
+
+Embeds a sample corpus of PDFs the same way rag_backend.ingest_pdf does,
+holds out a slice of the chunk vectors as queries and compares every
+compact index type against exact float32 search:
+
+    python index_report.py manual1.pdf manual2.pdf --k 4
+
+Embeddings go through the shared embedding cache, so re-running the report
+on the same corpus costs no API calls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_openai import OpenAIEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from compact_index import INDEX_TYPES, build_index, index_bytes
+from embedding_cache import CachedEmbeddings
+
+
+def embed_corpus(paths: List[str]) -> np.ndarray:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200, separators=["\n\n", "\n", " ", ""]
+    )
+    texts = []
+    for path in paths:
+        for page in PyPDFLoader(path).lazy_load():
+            texts.extend(chunk.page_content for chunk in splitter.split_documents([page]))
+
+    embeddings = CachedEmbeddings(
+        OpenAIEmbeddings(model="text-embedding-3-small"),
+        os.getenv("RAG_EMBEDDING_CACHE", "embedding_cache.db"),
+    )
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def report(
+    vectors: np.ndarray,
+    k: int = 4,
+    query_fraction: float = 0.1,
+    pq_m: int = 64,
+    nprobe: int = 16,
+    seed: int = 0,
+) -> List[dict]:
+    """Build every index type over the corpus and measure recall@k and size."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    n_queries = max(1, int(len(vectors) * query_fraction))
+    queries, corpus = vectors[order[:n_queries]], vectors[order[n_queries:]]
+
+    exact = build_index(corpus, "flat")
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for kind in INDEX_TYPES:
+        if kind == "ivfpq" and len(corpus) < 256:
+            continue
+        started = time.perf_counter()
+        index = build_index(corpus, kind, pq_m=pq_m, nprobe=nprobe)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _, found = index.search(queries, k)
+        search_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        recall = np.mean(
+            [len(set(f) & set(t)) / k for f, t in zip(found.tolist(), truth.tolist())]
+        )
+        size = index_bytes(index)
+        rows.append(
+            {
+                "type": kind,
+                "bytes": size,
+                "bytes_per_vector": size / len(corpus),
+                f"recall@{k}": float(recall),
+                "build_s": build_seconds,
+                "search_ms": search_ms,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pdfs", nargs="+", help="sample corpus")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--pq-m", type=int, default=int(os.getenv("RAG_PQ_M", "64")))
+    parser.add_argument("--nprobe", type=int, default=int(os.getenv("RAG_IVF_NPROBE", "16")))
+    args = parser.parse_args()
+
+    vectors = embed_corpus(args.pdfs)
+    print(f"{len(vectors)} chunks, {vectors.shape[1]} dims\n")
+    print(f"{'type':<7}{'bytes':>12}{'B/vector':>10}{'recall@' + str(args.k):>11}{'build s':>9}{'ms/query':>10}")
+    for row in report(vectors, k=args.k, pq_m=args.pq_m, nprobe=args.nprobe):
+        print(
+            f"{row['type']:<7}{row['bytes']:>12}{row['bytes_per_vector']:>10.0f}"
+            f"{row[f'recall@{args.k}']:>11.3f}{row['build_s']:>9.2f}{row['search_ms']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+PDF text extraction and splitting that can run in worker processes.
+
+Kept free of the chat backend's imports so a spawned worker only loads
+pypdf and the text splitter, not the LLM clients or the checkpointer.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=SEPARATORS
+    )
+
+
+def parse_page_range(path: str, start: int, stop: int) -> Tuple[List[Document], float]:
+    """Extract and split pages [start, stop); returns chunks and seconds spent."""
+    started = time.perf_counter()
+    reader = PdfReader(path)
+    splitter = make_splitter()
+    chunks: List[Document] = []
+    for page_number in range(start, stop):
+        text = reader.pages[page_number].extract_text() or ""
+        page = Document(
+            page_content=text,
+            metadata={
+                "page": page_number,
+                "page_label": str(page_number + 1),
+                "total_pages": len(reader.pages),
+            },
+        )
+        chunks.extend(splitter.split_documents([page]))
+    return chunks, time.perf_counter() - started
+
+
+def parallel_chunks(
+    path: str, total_pages: int, workers: int, pages_per_task: int, stats: dict
+) -> Iterable[Tuple[List[Document], int]]:
+    """
+    Fan page ranges out to a process pool and yield (chunks, pages) for each
+    range in page order, so results merge exactly as a sequential parse would.
+
+    At most 2 * `workers` ranges are parsed ahead of the consumer, which keeps
+    memory bounded when embedding is the slower stage.
+    `stats["parse_cpu"]` accumulates the time workers spent parsing.
+
+    Workers are spawned rather than forked: this runs on an ingest thread
+    of a process that also has sqlite, HTTP and compactor threads, and
+    forking a multithreaded process can leave a child holding a lock that
+    nobody will release.
+    """
+    ranges = [
+        (start, min(start + pages_per_task, total_pages))
+        for start in range(0, total_pages, pages_per_task)
+    ]
+    stats.setdefault("parse_cpu", 0.0)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        pending = deque()
+        for start, stop in ranges:
+            pending.append((pool.submit(parse_page_range, path, start, stop), stop - start))
+            if len(pending) >= 2 * workers:
+                yield _collect(pending.popleft(), stats)
+        while pending:
+            yield _collect(pending.popleft(), stats)
+
+
+def _collect(entry, stats: dict) -> Tuple[List[Document], int]:
+    future, n_pages = entry
+    chunks, seconds = future.result()
+    stats["parse_cpu"] += seconds
+    return chunks, n_pages
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from hybrid import tokenize
+
+
+def _normalise_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _identifiers(query: str) -> FrozenSet[str]:
+    """Tokens with digits (error codes, part numbers) that must match exactly."""
+    return frozenset(token for token in tokenize(query) if any(c.isdigit() for c in token))
+
+
+class _Entry:
+    __slots__ = ("vector", "identifiers", "result", "created")
+
+    def __init__(self, vector: np.ndarray, identifiers: FrozenSet[str], result: Any):
+        self.vector = vector
+        self.identifiers = identifiers
+        self.result = result
+        self.created = time.monotonic()
+
+
+class QueryCache:
+    """
+    Per-thread cache of retrieval results for exact and near-duplicate queries.
+
+    Entries are keyed by the normalised query text and also matched by cosine
+    similarity of the query embedding (>= `threshold`). A paraphrase only hits
+    when it names the same identifiers, so "error E305" never reuses the
+    results for "error E306". Each thread's bucket is tied to the index version
+    it was filled from and is dropped as soon as that version changes.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        max_entries: int = 128,
+        max_threads: int = 256,
+        threshold: float = 0.95,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_threads = max_threads
+        self.threshold = threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # thread_id -> (index version, normalised query -> entry)
+        self._buckets: "OrderedDict[str, tuple[str, OrderedDict[str, _Entry]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, thread_id: str, version: str) -> "OrderedDict[str, _Entry]":
+        bucket = self._buckets.get(thread_id)
+        if bucket is None or bucket[0] != version:
+            bucket = (version, OrderedDict())
+            self._buckets[thread_id] = bucket
+            while len(self._buckets) > self.max_threads:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(thread_id)
+        return bucket[1]
+
+    def _expire(self, entries: "OrderedDict[str, _Entry]") -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key in [key for key, entry in entries.items() if entry.created < cutoff]:
+            del entries[key]
+
+    def get(self, thread_id: str, version: str, query: str) -> Optional[Any]:
+        """Exact-match lookup; needs no embedding."""
+        with self._lock:
+            entries = self._bucket(thread_id, version)
+            self._expire(entries)
+            entry = entries.get(_normalise_query(query))
+            if entry is None:
+                return None
+            entries.move_to_end(_normalise_query(query))
+            self.exact_hits += 1
+            return entry.result
+
+    def get_similar(
+        self, thread_id: str, version: str, query: str, vector: List[float]
+    ) -> Optional[Any]:
+        """Nearest cached query by cosine similarity, if above the threshold."""
+        query_vector = np.asarray(vector, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        identifiers = _identifiers(query)
+        with self._lock:
+            entries = self._bucket(thread_id, version)
+            candidates = [
+                (key, entry)
+                for key, entry in entries.items()
+                if entry.identifiers == identifiers
+            ]
+            if candidates:
+                matrix = np.stack([entry.vector for _, entry in candidates])
+                scores = matrix @ query_vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return entry.result
+            self.misses += 1
+            return None
+
+    def put(
+        self, thread_id: str, version: str, query: str, vector: List[float], result: Any
+    ) -> None:
+        stored = np.asarray(vector, dtype=np.float32)
+        stored = stored / (np.linalg.norm(stored) or 1.0)
+        with self._lock:
+            entries = self._bucket(thread_id, version)
+            entries[_normalise_query(query)] = _Entry(stored, _identifiers(query), result)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, thread_id: str) -> None:
+        with self._lock:
+            self._buckets.pop(thread_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "threads": len(self._buckets),
+            }
@@ -9,28 +9,90 @@ from langchain_community.vectorstores import FAISS
 from langchain_core.messages import HumanMessage, BaseMessage
 from typing import TypedDict, Annotated
 from dotenv import load_dotenv
+import hashlib
+import json
+import os
+import shutil
+import sys
 
 load_dotenv()
 
 # LLM
 llm = ChatOpenAI(model='gpt-4.1-mini')
 
-# Document Loader
-loader = PyPDFLoader('System Design Playbook.pdf')
-docs = loader.load()
-
-# Splitter
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000,chunk_overlap=200)
-chunks = splitter.split_documents(docs)
+PDF_PATH = 'System Design Playbook.pdf'
+INDEX_ROOT = 'index'
+# Bump when the chunking or embedding settings below change, so old artifacts are ignored
+INDEX_FORMAT_VERSION = 1
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_MODEL = 'text-embedding-3-small'
 
 # Embeddings
-embeddings = OpenAIEmbeddings(model='text-embedding-3-small')
+embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+def pdf_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-# Vector Store
-vector_store = FAISS.from_documents(chunks,embeddings)
+def artifact_dir(source_hash):
+    return os.path.join(INDEX_ROOT, f'v{INDEX_FORMAT_VERSION}-{source_hash[:16]}')
 
-# Retriever
-retriever = vector_store.as_retriever(search_type='similarity',search_kwargs={'k' : 4})
+def build_index(pdf_path=PDF_PATH):
+    """
+    Embed the PDF once and save the FAISS index as a versioned artifact keyed by the PDF hash.
+    Does nothing if the artifact for this exact PDF already exists.
+    """
+    source_hash = pdf_hash(pdf_path)
+    target = artifact_dir(source_hash)
+    if os.path.exists(os.path.join(target, 'manifest.json')):
+        return target
+
+    # Document Loader
+    docs = PyPDFLoader(pdf_path).load()
+
+    # Splitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE,chunk_overlap=CHUNK_OVERLAP)
+    chunks = splitter.split_documents(docs)
+
+    # Vector Store, written next to the target and moved into place once complete
+    staging = f'{target}.tmp-{os.getpid()}'
+    FAISS.from_documents(chunks,embeddings).save_local(staging)
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({
+            'format_version' : INDEX_FORMAT_VERSION,
+            'source' : os.path.basename(pdf_path),
+            'sha256' : source_hash,
+            'embedding_model' : EMBEDDING_MODEL,
+            'chunk_size' : CHUNK_SIZE,
+            'chunk_overlap' : CHUNK_OVERLAP,
+            'pages' : len(docs),
+            'chunks' : len(chunks),
+        }, f, indent=2)
+    try:
+        os.replace(staging, target)
+    except OSError:
+        # Another process finished the same artifact first
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+# Retriever, loaded on the first rag_tool call and reloaded only when the PDF changes
+_retriever = None
+_retriever_source = None
+
+def get_retriever():
+    global _retriever, _retriever_source
+    stat = os.stat(PDF_PATH)
+    source = (stat.st_mtime_ns, stat.st_size)
+    if _retriever is None or source != _retriever_source:
+        target = build_index(PDF_PATH)
+        vector_store = FAISS.load_local(target, embeddings, allow_dangerous_deserialization=True)
+        _retriever = vector_store.as_retriever(search_type='similarity',search_kwargs={'k' : 4})
+        _retriever_source = source
+    return _retriever
 
 # Tool
 @tool
@@ -40,7 +102,7 @@ def rag_tool(query):
     Use this tool when the user asks factual / conceptual questions that might be answered from the stored documents.
     """
 
-    result = retriever.invoke(query)
+    result = get_retriever().invoke(query)
 
     context = [doc.page_content for doc in result]
     metadata = [doc.metadata for doc in result]
@@ -73,18 +135,25 @@ tool_node = ToolNode(tools)
 graph = StateGraph(ChatState)
 
 graph.add_node('chat_node',chat_node)
-graph.add_node('tool_node',tool_node)
+graph.add_node('tools',tool_node)
 
 graph.add_edge(START,'chat_node')
 graph.add_conditional_edges('chat_node',tools_condition)
-graph.add_edge('tool_node','chat_node')
+graph.add_edge('tools','chat_node')
 
 chatbot = graph.compile()
 
-result = chatbot.invoke(
-    {
-        'messages' : [HumanMessage(content=("Using the pdf, Explain how amazon s2 achieves 99.99 percent durability?"))]
-    }
-)
+if __name__ == '__main__':
+    # python rag.py build  -> build the index artifact offline
+    # python rag.py        -> ask the demo question
+    if sys.argv[1:] == ['build']:
+        print(f"Index artifact ready at {build_index(PDF_PATH)}")
+        sys.exit(0)
+
+    result = chatbot.invoke(
+        {
+            'messages' : [HumanMessage(content=("Using the pdf, Explain how amazon s2 achieves 99.99 percent durability?"))]
+        }
+    )
 
-print(result['messages'][-1].content)
\ No newline at end of file
+    print(result['messages'][-1].content)
\ No newline at end of file
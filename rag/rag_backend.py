@@ -1,24 +1,57 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-import sqlite3
+import pickle
+import re
+import shutil
+import sys
 import tempfile
-from typing import Annotated, Any, Dict, Optional, TypedDict
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (
+    Annotated,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+)
 
 from dotenv import load_dotenv
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
 from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
+from pypdf import PdfReader
 import requests
 
+from compact_index import all_vectors, build_index, index_type, target_type
+from embedding_cache import CachedEmbeddings
+from hybrid import BM25Index, HybridRetriever
+from pdf_parsing import make_splitter, parallel_chunks
+from query_cache import QueryCache
+from retriever_cache import RetrieverCache
+
+# The chat checkpointers are shared with the ChatNode apps.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from checkpointer import make_checkpointer  # noqa: E402
+from conversation import DEFAULT_PAGE_SIZE, load_message_page  # noqa: E402
+from retention import start_compactor  # noqa: E402
+from singleflight import coalesce  # noqa: E402
+
 load_dotenv()
 
 api_key = os.getenv("ALPHAVANTAGE_API_KEY")
@@ -28,66 +61,675 @@ api_key = os.getenv("ALPHAVANTAGE_API_KEY")
 # -------------------
 llm = ChatOpenAI(model="gpt-4o-mini")
 embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+# Chunk vectors are cached on disk, so re-uploaded pages skip the embedding API.
+cached_embeddings = CachedEmbeddings(
+    embeddings, os.getenv("RAG_EMBEDDING_CACHE", "embedding_cache.db")
+)
 
 # -------------------
 # 2. PDF retriever store (per thread)
 # -------------------
-_THREAD_RETRIEVERS: Dict[str, Any] = {}
+# Each thread's index lives in INDEX_DIR/<thread_id>/<version>/ and the
+# thread's CURRENT file names the live version, so a restart or another
+# worker process can reopen it without re-embedding the PDF.
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_indexes")
+_THREAD_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Chunks are embedded in batches, with at most EMBED_CONCURRENCY requests in flight.
+EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("RAG_EMBED_CONCURRENCY", "4"))
+
+# Parallel ingestion parses PARSE_PAGES_PER_TASK-page ranges on PARSE_WORKERS processes.
+PARSE_WORKERS = int(os.getenv("RAG_PARSE_WORKERS", str(os.cpu_count() or 2)))
+PARSE_PAGES_PER_TASK = int(os.getenv("RAG_PARSE_PAGES_PER_TASK", "8"))
+
+# Vector and BM25 hits are fused with reciprocal rank fusion ("rrf") or a
+# weighted blend of normalised scores ("weighted", vector weight RAG_HYBRID_ALPHA).
+RAG_FUSION = os.getenv("RAG_FUSION", "rrf")
+RAG_HYBRID_ALPHA = float(os.getenv("RAG_HYBRID_ALPHA", "0.5"))
+
+# Vector storage for saved indexes: flat | fp16 | sq8 | ivfpq (see compact_index.py).
+# ivfpq is only used from RAG_IVF_MIN_CHUNKS chunks up; smaller threads use sq8.
+RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+RAG_IVF_MIN_CHUNKS = int(os.getenv("RAG_IVF_MIN_CHUNKS", "5000"))
+RAG_PQ_M = int(os.getenv("RAG_PQ_M", "64"))
+RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "16"))
+
+# thread_id -> (index version, retriever, bytes on disk) for indexes opened by
+# this process, bounded by RAG_CACHE_MAX_BYTES with LRU eviction.
+_THREAD_RETRIEVERS = RetrieverCache(
+    max_bytes=int(os.getenv("RAG_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+    sizeof=lambda entry: entry[2],
+)
 _THREAD_METADATA: Dict[str, dict] = {}
+# thread_id -> locked retriever over the partial index while a streaming ingestion runs
+_INGESTING: Dict[str, HybridRetriever] = {}
+# Recent rag_tool results per thread, reused for repeated and paraphrased queries.
+_QUERY_CACHE = QueryCache(
+    ttl_seconds=float(os.getenv("RAG_QUERY_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("RAG_QUERY_CACHE_SIZE", "128")),
+    threshold=float(os.getenv("RAG_QUERY_CACHE_THRESHOLD", "0.95")),
+)
+# Background ingestion jobs started by submit_ingest_job, by job id.
+_INGEST_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAG_INGEST_WORKERS", "2")), thread_name_prefix="ingest"
+)
+_JOBS: Dict[str, dict] = {}
+_JOBS_LOCK = threading.Lock()
+# Serialises read-modify-write updates of one thread's index in this process.
+_THREAD_WRITE_LOCKS: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+
+def _thread_dir(thread_id: Optional[str]) -> Optional[str]:
+    """Directory holding a thread's index versions, or None for unsafe ids."""
+    if not thread_id or not _THREAD_ID_RE.match(str(thread_id)):
+        return None
+    return os.path.join(INDEX_DIR, str(thread_id))
+
+
+def _current_version(thread_id: str) -> Optional[str]:
+    thread_dir = _thread_dir(thread_id)
+    if thread_dir is None:
+        return None
+    try:
+        with open(os.path.join(thread_dir, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
 
 
-def _get_retriever(thread_id: Optional[str]):
-    """Fetch the retriever for a thread if available."""
-    if thread_id and thread_id in _THREAD_RETRIEVERS:
-        return _THREAD_RETRIEVERS[thread_id]
-    return None
-
+def _save_thread_index(
+    thread_id: str, vector_store: FAISS, keyword_index: BM25Index, metadata: dict
+) -> None:
+    """Write the thread's FAISS index, chunk store, BM25 index and summary to disk.
 
-def ingest_pdf(file_bytes: bytes, thread_id: str, filename: Optional[str] = None) -> dict:
+    The new version is written next to the old one and published by atomically
+    replacing CURRENT, so readers never open a half-written index.
     """
-    Build a FAISS retriever for the uploaded PDF and store it for the thread.
+    thread_dir = _thread_dir(thread_id)
+    if thread_dir is None:
+        raise ValueError(f"Invalid thread id for index storage: {thread_id!r}")
+    os.makedirs(thread_dir, exist_ok=True)
+
+    _compact_index(vector_store)
+    previous = _current_version(thread_id)
+    version = uuid.uuid4().hex
+    version_dir = os.path.join(thread_dir, version)
+    vector_store.save_local(version_dir)
+    with open(os.path.join(version_dir, "bm25.pkl"), "wb") as f:
+        pickle.dump(keyword_index, f)
+    with open(os.path.join(version_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+    pointer = os.path.join(thread_dir, "CURRENT.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(thread_dir, "CURRENT"))
+
+    # Processes that already mapped the old files keep them until they reopen.
+    if previous:
+        shutil.rmtree(os.path.join(thread_dir, previous), ignore_errors=True)
+
+
+def _expand_index(vector_store: FAISS) -> None:
+    """Decode a saved compact index to flat before more vectors are added.
+
+    Adding straight into an sq8/ivfpq index would encode the new document with
+    ranges or centroids trained only on the earlier ones.
+    """
+    index = vector_store.index
+    if index_type(index) != "flat":
+        vector_store.index = build_index(all_vectors(index), "flat")
+
 
-    Returns a summary dict that can be surfaced in the UI.
+def _compact_index(vector_store: FAISS) -> None:
+    """Re-encode the index as RAG_INDEX_TYPE before it is saved.
+
+    Ingestion fills a flat index (an existing thread's index is expanded to
+    flat first by `_expand_index`); it is only converted, and quantizers
+    trained on the whole corpus, here once all of a document's vectors are in.
     """
-    if not file_bytes:
-        raise ValueError("No bytes received for ingestion.")
+    index = vector_store.index
+    target = target_type(RAG_INDEX_TYPE, index.ntotal, RAG_IVF_MIN_CHUNKS)
+    if index.ntotal and index_type(index) != target:
+        vector_store.index = build_index(
+            all_vectors(index), target, pq_m=RAG_PQ_M, nprobe=RAG_IVF_NPROBE
+        )
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-        temp_file.write(file_bytes)
-        temp_path = temp_file.name
 
-    try:
-        loader = PyPDFLoader(temp_path)
-        docs = loader.load()
+def _delete_chunks(vector_store: FAISS, chunk_ids: List[str]) -> None:
+    """Delete chunks, keeping FAISS positions and the docstore mapping aligned.
 
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200, separators=["\n\n", "\n", " ", ""]
+    LangChain's delete assumes the index renumbers like a flat index; IVF keeps
+    its labels instead, so IVF indexes are decoded to a flat index for the
+    delete and re-filled into the same trained quantizer afterwards.
+    """
+    index = vector_store.index
+    if index_type(index) != "ivfpq":
+        vector_store.delete(chunk_ids)
+        return
+    vector_store.index = build_index(all_vectors(index), "flat")
+    vector_store.delete(chunk_ids)
+    index.reset()
+    index.add(all_vectors(vector_store.index))
+    vector_store.index = index
+
+
+def _remove_thread_index(thread_id: str) -> None:
+    thread_dir = _thread_dir(thread_id)
+    if thread_dir is not None:
+        shutil.rmtree(thread_dir, ignore_errors=True)
+
+
+def _load_vector_store(
+    thread_id: str, version: str, writable: bool = False
+) -> Optional[FAISS]:
+    """Open a persisted index, memory-mapped read-only unless it will be modified."""
+    version_dir = os.path.join(_thread_dir(thread_id), version)
+    if not os.path.exists(os.path.join(version_dir, "index.faiss")):
+        return None
+    if writable:
+        return FAISS.load_local(
+            version_dir, embeddings, allow_dangerous_deserialization=True
         )
-        chunks = splitter.split_documents(docs)
 
-        vector_store = FAISS.from_documents(chunks, embeddings)
-        retriever = vector_store.as_retriever(
-            search_type="similarity", search_kwargs={"k": 4}
+    import faiss
+
+    try:
+        return FAISS.load_local(
+            version_dir,
+            embeddings,
+            allow_dangerous_deserialization=True,
+            io_flags=faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+        )
+    except RuntimeError:
+        # Index types without mmap support are read into private memory.
+        return FAISS.load_local(
+            version_dir, embeddings, allow_dangerous_deserialization=True
         )
 
-        _THREAD_RETRIEVERS[str(thread_id)] = retriever
-        _THREAD_METADATA[str(thread_id)] = {
-            "filename": filename or os.path.basename(temp_path),
-            "documents": len(docs),
-            "chunks": len(chunks),
-        }
 
-        return {
-            "filename": filename or os.path.basename(temp_path),
-            "documents": len(docs),
-            "chunks": len(chunks),
-        }
-    finally:
-        # The FAISS store keeps copies of the text, so the temp file is safe to remove.
+def _load_keyword_index(thread_id: str, version: str, vector_store: FAISS) -> BM25Index:
+    """Open the thread's BM25 index, rebuilding it for indexes saved without one."""
+    path = os.path.join(_thread_dir(thread_id), version, "bm25.pkl")
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except OSError:
+        keyword_index = BM25Index()
+        for chunk_id in vector_store.index_to_docstore_id.values():
+            doc = vector_store.docstore.search(chunk_id)
+            if isinstance(doc, Document):
+                keyword_index.add(chunk_id, doc.page_content)
+        return keyword_index
+
+
+def _make_retriever(
+    vector_store: FAISS,
+    keyword_index: Optional[BM25Index],
+    lock: Optional[threading.Lock] = None,
+) -> HybridRetriever:
+    return HybridRetriever(
+        vector_store=vector_store,
+        keyword_index=keyword_index,
+        k=4,
+        fusion=RAG_FUSION,
+        alpha=RAG_HYBRID_ALPHA,
+        lock=lock,
+    )
+
+
+def _index_size(thread_id: str, version: str) -> int:
+    """Bytes of the persisted index and chunk store, used to weigh cache entries."""
+    version_dir = os.path.join(_thread_dir(thread_id), version)
+    total = 0
+    for name in ("index.faiss", "index.pkl", "bm25.pkl"):
         try:
-            os.remove(temp_path)
+            total += os.path.getsize(os.path.join(version_dir, name))
         except OSError:
             pass
+    return total
+
+
+def _load_thread_metadata(thread_id: str) -> dict:
+    version = _current_version(thread_id)
+    if version is None:
+        return {}
+    path = os.path.join(_thread_dir(thread_id), version, "metadata.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _get_retriever(thread_id: Optional[str]):
+    """Fetch the retriever for a thread, opening its on-disk index on first use.
+
+    While a streaming ingestion runs, the partial index being built is served.
+    """
+    partial = _INGESTING.get(str(thread_id))
+    if partial is not None:
+        return partial
+
+    version = _current_version(thread_id)
+    if version is None:
+        return None
+
+    key = str(thread_id)
+    cached = _THREAD_RETRIEVERS.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    vector_store = _load_vector_store(key, version)
+    if vector_store is None:
+        return None
+    retriever = _make_retriever(
+        vector_store, _load_keyword_index(key, version, vector_store)
+    )
+    _THREAD_RETRIEVERS.put(key, (version, retriever, _index_size(key, version)))
+    _THREAD_METADATA[key] = _load_thread_metadata(key)
+    return retriever
+
+
+def _search(thread_id: str, retriever: HybridRetriever, query: str) -> List[Document]:
+    """Run a retrieval through the thread's query cache."""
+    version = None if thread_id in _INGESTING else _current_version(thread_id)
+    if version is None:
+        # A partial index changes with every batch, so its results are not cached.
+        return retriever.invoke(query)
+
+    result = _QUERY_CACHE.get(thread_id, version, query)
+    if result is not None:
+        return result
+
+    query_vector = embeddings.embed_query(query)
+    result = _QUERY_CACHE.get_similar(thread_id, version, query, query_vector)
+    if result is None:
+        result = retriever.search_by_vector(query, query_vector)
+        _QUERY_CACHE.put(thread_id, version, query, query_vector, result)
+    return result
+
+
+def _batched(chunks: Iterable[Document], size: int) -> Iterable[List[Document]]:
+    batch: List[Document] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _embed_batch(batch: List[Document]) -> Tuple[List[Document], List[List[float]]]:
+    return batch, cached_embeddings.embed_documents([doc.page_content for doc in batch])
+
+
+def _embed_and_index(
+    chunks: Iterable[Document],
+    total: Optional[int] = None,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    lock: Optional[threading.Lock] = None,
+    on_batch: Optional[Callable[[FAISS], None]] = None,
+    vector_store: Optional[FAISS] = None,
+    keyword_index: Optional[BM25Index] = None,
+) -> Tuple[Optional[FAISS], dict]:
+    """
+    Embed chunks in concurrent batches and add each batch to a FAISS index
+    as soon as its vectors arrive.
+
+    Batches are pulled from `chunks` lazily, so no more than
+    EMBED_CONCURRENCY batches are ever waiting on the embedding API. Chunks
+    are appended to `vector_store` when given, otherwise to a new index, and
+    to `keyword_index` when given. Index writes hold `lock` when given, and
+    `on_batch` sees the index after each add.
+
+    The returned stats split wall time into waiting for chunks (parse),
+    waiting for embeddings (embed) and adding to the indexes (index).
+    """
+    indexed = 0
+    timings = {"parse": 0.0, "embed": 0.0, "index": 0.0}
+    started = time.perf_counter()
+    lock = lock or threading.Lock()
+
+    def add(batch: List[Document], vectors: List[List[float]]) -> None:
+        nonlocal vector_store, indexed
+        add_started = time.perf_counter()
+        text_embeddings = [(doc.page_content, vec) for doc, vec in zip(batch, vectors)]
+        metadatas = [doc.metadata for doc in batch]
+        ids = [_chunk_id(doc) for doc in batch]
+        with lock:
+            if vector_store is None:
+                vector_store = FAISS.from_embeddings(
+                    text_embeddings, embeddings, metadatas=metadatas, ids=ids
+                )
+            else:
+                vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            if keyword_index is not None:
+                for chunk_id, doc in zip(ids, batch):
+                    keyword_index.add(chunk_id, doc.page_content)
+        timings["index"] += time.perf_counter() - add_started
+        indexed += len(batch)
+        if on_batch is not None:
+            on_batch(vector_store)
+        if progress is not None:
+            progress(indexed, total)
+
+    def collect(futures) -> None:
+        wait_started = time.perf_counter()
+        results = [future.result() for future in futures]
+        timings["embed"] += time.perf_counter() - wait_started
+        for result in results:
+            add(*result)
+
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as pool:
+        pending = set()
+        batches = _batched(chunks, EMBED_BATCH_SIZE)
+        while True:
+            parse_started = time.perf_counter()
+            batch = next(batches, None)
+            timings["parse"] += time.perf_counter() - parse_started
+            if batch is None:
+                break
+            if len(pending) >= EMBED_CONCURRENCY:
+                wait_started = time.perf_counter()
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                timings["embed"] += time.perf_counter() - wait_started
+                collect(done)
+            pending.add(pool.submit(_embed_batch, batch))
+        collect(pending)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "embed_seconds": round(elapsed, 3),
+        "chunks_per_second": round(indexed / elapsed, 1) if elapsed > 0 else None,
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
+    return vector_store, stats
+
+
+def _chunk_id(chunk: Document) -> str:
+    return f"{chunk.metadata['doc_id']}-{chunk.metadata['chunk']}"
+
+
+def _tag_chunk(chunk: Document, doc_id: str, filename: str, position: int) -> Document:
+    """Stamp a chunk with its document, so its vectors can be deleted later."""
+    chunk.metadata.update(
+        {"doc_id": doc_id, "source": filename, "chunk": position}
+    )
+    return chunk
+
+
+def _stream_chunks(
+    path: str, counts: Dict[str, int], doc_id: str, filename: str
+) -> Iterable[Document]:
+    """Parse and split one page at a time, tallying pages and chunks as they go."""
+    splitter = make_splitter()
+    for page in PyPDFLoader(path).lazy_load():
+        counts["documents"] += 1
+        for chunk in splitter.split_documents([page]):
+            yield _tag_chunk(chunk, doc_id, filename, counts["chunks"])
+            counts["chunks"] += 1
+
+
+def _parallel_stream_chunks(
+    path: str,
+    total_pages: int,
+    counts: Dict[str, int],
+    doc_id: str,
+    filename: str,
+    parse_stats: dict,
+) -> Iterable[Document]:
+    """Like _stream_chunks, but pages are parsed and split on a process pool."""
+    for chunks, n_pages in parallel_chunks(
+        path, total_pages, PARSE_WORKERS, PARSE_PAGES_PER_TASK, parse_stats
+    ):
+        counts["documents"] += n_pages
+        for chunk in chunks:
+            yield _tag_chunk(chunk, doc_id, filename, counts["chunks"])
+            counts["chunks"] += 1
+
+
+def _thread_totals(files: Dict[str, dict]) -> dict:
+    """Thread-level summary; `filename` is the most recently added document."""
+    latest = list(files.values())[-1] if files else {}
+    return {
+        "filename": latest.get("filename"),
+        "documents": sum(f["documents"] for f in files.values()),
+        "chunks": sum(f["chunks"] for f in files.values()),
+        "files": files,
+    }
+
+
+def ingest_pdf(
+    file_bytes: bytes,
+    thread_id: str,
+    filename: Optional[str] = None,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    streaming: bool = False,
+    parallel: bool = False,
+) -> dict:
+    """
+    Add the uploaded PDF to the thread's FAISS index and persist it.
+
+    Documents are appended to whatever the thread already holds; each one is
+    identified by a hash of its bytes, so re-uploading a PDF is a no-op. With
+    `streaming=True` pages are parsed, split, embedded and indexed one at a
+    time, keeping memory bounded for large PDFs; the thread is queryable over
+    the pages indexed so far while ingestion runs. `parallel=True` streams the
+    same way but extracts and splits page ranges on a process pool
+    (RAG_PARSE_WORKERS), merging chunks in page order. `progress`, if given,
+    is called with (chunks indexed, total chunks) after every embedding batch;
+    when streaming, the total is estimated from the pages parsed so far.
+    Returns a summary dict that can be surfaced in the UI, including
+    per-stage timings to tell parse-bound jobs from embed-bound ones.
+    """
+    if not file_bytes:
+        raise ValueError("No bytes received for ingestion.")
+    if _thread_dir(thread_id) is None:
+        raise ValueError(f"Invalid thread id for ingestion: {thread_id!r}")
+
+    key = str(thread_id)
+    doc_id = hashlib.sha256(file_bytes).hexdigest()[:16]
+
+    with _THREAD_WRITE_LOCKS[key]:
+        version = _current_version(key)
+        files = dict(_load_thread_metadata(key).get("files", {})) if version else {}
+        if doc_id in files:
+            return {**files[doc_id], "doc_id": doc_id}
+        existing = _load_vector_store(key, version, writable=True) if version else None
+        if existing is not None:
+            _expand_index(existing)
+        keyword_index = (
+            _load_keyword_index(key, version, existing) if existing else BM25Index()
+        )
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+            temp_file.write(file_bytes)
+            temp_path = temp_file.name
+        filename = filename or os.path.basename(temp_path)
+
+        try:
+            if streaming or parallel:
+                counts = {"documents": 0, "chunks": 0}
+                parse_stats: dict = {}
+                lock = threading.Lock()
+                total_pages = len(PdfReader(temp_path).pages)
+                if parallel:
+                    chunks = _parallel_stream_chunks(
+                        temp_path, total_pages, counts, doc_id, filename, parse_stats
+                    )
+                else:
+                    chunks = _stream_chunks(temp_path, counts, doc_id, filename)
+
+                def publish(partial_store: FAISS) -> None:
+                    _INGESTING[key] = _make_retriever(partial_store, keyword_index, lock)
+
+                def estimate_progress(indexed: int, _: Optional[int]) -> None:
+                    if progress is None:
+                        return
+                    chunks_per_page = counts["chunks"] / max(counts["documents"], 1)
+                    progress(indexed, max(indexed, round(chunks_per_page * total_pages)))
+
+                vector_store, stats = _embed_and_index(
+                    chunks,
+                    progress=estimate_progress,
+                    lock=lock,
+                    on_batch=publish,
+                    vector_store=existing,
+                    keyword_index=keyword_index,
+                )
+                stats["timings"].update(
+                    {stage: round(seconds, 3) for stage, seconds in parse_stats.items()}
+                )
+            else:
+                parse_started = time.perf_counter()
+                docs = PyPDFLoader(temp_path).load()
+                chunks = [
+                    _tag_chunk(chunk, doc_id, filename, position)
+                    for position, chunk in enumerate(make_splitter().split_documents(docs))
+                ]
+                parse_seconds = time.perf_counter() - parse_started
+                counts = {"documents": len(docs), "chunks": len(chunks)}
+                vector_store, stats = _embed_and_index(
+                    chunks,
+                    len(chunks),
+                    progress,
+                    vector_store=existing,
+                    keyword_index=keyword_index,
+                )
+                stats["timings"]["parse"] = round(parse_seconds, 3)
+
+            if counts["chunks"] == 0:
+                raise ValueError("No text could be extracted from the PDF.")
+
+            summary = {"filename": filename, **counts}
+            files[doc_id] = summary
+            metadata = _thread_totals(files)
+            save_started = time.perf_counter()
+            _save_thread_index(key, vector_store, keyword_index, metadata)
+            stats["timings"]["save"] = round(time.perf_counter() - save_started, 3)
+            _THREAD_METADATA[key] = metadata
+            _QUERY_CACHE.invalidate(key)
+
+            return {**summary, "doc_id": doc_id, **stats}
+        finally:
+            _INGESTING.pop(key, None)
+            # The FAISS store keeps copies of the text, so the temp file is safe to remove.
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+def submit_ingest_job(
+    file_bytes: bytes,
+    thread_id: str,
+    filename: Optional[str] = None,
+    parallel: bool = False,
+) -> str:
+    """
+    Queue a streaming (or, with `parallel=True`, process-pool) ingestion on
+    the background worker pool.
+
+    Returns a job id for `ingest_job_status`; the thread is queryable over the
+    pages indexed so far while the job runs.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "thread_id": str(thread_id),
+        "filename": filename,
+        "status": "queued",
+        "progress": 0.0,
+        "chunks_indexed": 0,
+        "summary": None,
+        "error": None,
+        "finished_at": None,
+    }
+
+    def update(indexed: int, total: Optional[int]) -> None:
+        job["chunks_indexed"] = indexed
+        if total:
+            job["progress"] = min(indexed / total, 1.0)
+
+    def run() -> None:
+        job["status"] = "running"
+        try:
+            job["summary"] = ingest_pdf(
+                file_bytes,
+                thread_id,
+                filename,
+                progress=update,
+                streaming=True,
+                parallel=parallel,
+            )
+            job["progress"] = 1.0
+            job["status"] = "done"
+        except Exception as exc:
+            job["error"] = str(exc)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+
+    with _JOBS_LOCK:
+        # Finished jobs are kept for an hour so late pollers still see the result.
+        cutoff = time.time() - 3600
+        for stale in [
+            jid for jid, j in _JOBS.items() if j["finished_at"] and j["finished_at"] < cutoff
+        ]:
+            del _JOBS[stale]
+        _JOBS[job_id] = job
+    _INGEST_POOL.submit(run)
+    return job_id
+
+
+def ingest_job_status(job_id: str) -> Optional[dict]:
+    """Snapshot of a job: status (queued|running|done|failed), progress 0-1, summary, error."""
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        return dict(job) if job else None
+
+
+def delete_document(thread_id: str, doc_id: str) -> bool:
+    """
+    Remove one document's vectors from the thread's index, keeping the rest.
+
+    Returns False when the thread holds no such document.
+    """
+    key = str(thread_id)
+    with _THREAD_WRITE_LOCKS[key]:
+        version = _current_version(key)
+        if version is None:
+            return False
+        files = dict(_load_thread_metadata(key).get("files", {}))
+        if doc_id not in files:
+            return False
+
+        files.pop(doc_id)
+        if not files:
+            _remove_thread_index(key)
+            _THREAD_RETRIEVERS.pop(key)
+            _THREAD_METADATA.pop(key, None)
+            _QUERY_CACHE.invalidate(key)
+            return True
+
+        vector_store = _load_vector_store(key, version, writable=True)
+        ids = [
+            chunk_id
+            for chunk_id in vector_store.index_to_docstore_id.values()
+            if chunk_id.startswith(f"{doc_id}-")
+        ]
+        if ids:
+            _delete_chunks(vector_store, ids)
+        keyword_index = _load_keyword_index(key, version, vector_store)
+        keyword_index.remove(ids)
+        metadata = _thread_totals(files)
+        _save_thread_index(key, vector_store, keyword_index, metadata)
+        _THREAD_METADATA[key] = metadata
+        _QUERY_CACHE.invalidate(key)
+        return True
 
 
 # -------------------
@@ -127,6 +769,7 @@ def calculator(first_num: float, second_num: float, operation: str) -> dict:
 
 
 @tool
+@coalesce
 def get_stock_price(symbol: str) -> dict:
     """
     Fetch latest stock price for a given symbol (e.g. 'AAPL', 'TSLA') 
@@ -141,6 +784,7 @@ def get_stock_price(symbol: str) -> dict:
 
 
 @tool
+@coalesce
 def rag_tool(query: str, thread_id: Optional[str] = None) -> dict:
     """
     Retrieve relevant information from the uploaded PDF for this chat thread.
@@ -153,7 +797,8 @@ def rag_tool(query: str, thread_id: Optional[str] = None) -> dict:
             "query": query,
         }
 
-    result = retriever.invoke(query)
+    result = _search(str(thread_id), retriever, query)
+
     context = [doc.page_content for doc in result]
     metadata = [doc.metadata for doc in result]
 
@@ -161,7 +806,7 @@ def rag_tool(query: str, thread_id: Optional[str] = None) -> dict:
         "query": query,
         "context": context,
         "metadata": metadata,
-        "source_file": _THREAD_METADATA.get(str(thread_id), {}).get("filename"),
+        "source_file": thread_document_metadata(str(thread_id)).get("filename"),
     }
 
 
@@ -204,8 +849,14 @@ tool_node = ToolNode(tools)
 # -------------------
 # 6. Checkpointer
 # -------------------
-conn = sqlite3.connect(database="chatbot.db", check_same_thread=False)
-checkpointer = SqliteSaver(conn=conn)
+checkpointer = make_checkpointer(
+    "chatbot.db",
+    readers=int(os.getenv("CHECKPOINT_READERS", "4")),
+    snapshot_every=int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "20")),
+    compress=os.getenv("CHECKPOINT_COMPRESSION", "1") == "1",
+)
+conn = checkpointer.conn
+compactor = start_compactor(conn, lock=checkpointer.lock)
 
 # -------------------
 # 7. Graph
@@ -223,16 +874,38 @@ chatbot = graph.compile(checkpointer=checkpointer)
 # -------------------
 # 8. Helpers
 # -------------------
-def retrieve_all_threads():
-    all_threads = set()
-    for checkpoint in checkpointer.list(None):
-        all_threads.add(checkpoint.config["configurable"]["thread_id"])
-    return list(all_threads)
+def retrieve_all_threads(limit: Optional[int] = None, offset: int = 0) -> List[str]:
+    # The registry pages newest first; the sidebar appends and renders reversed.
+    threads = checkpointer.list_threads(limit=limit, offset=offset)
+    return [thread["thread_id"] for thread in reversed(threads)]
+
+
+def load_messages(
+    thread_id: str, limit: int = DEFAULT_PAGE_SIZE, before: Optional[int] = None
+) -> Tuple[List[BaseMessage], Optional[int]]:
+    """Last `limit` messages before the `before` cursor, and the cursor for the page before them."""
+    return load_message_page(chatbot, thread_id, limit, before)
 
 
 def thread_has_document(thread_id: str) -> bool:
-    return str(thread_id) in _THREAD_RETRIEVERS
+    key = str(thread_id)
+    return key in _INGESTING or _current_version(key) is not None
+
+
+def retriever_cache_stats() -> dict:
+    """Hit, miss and eviction counters for sizing RAG_CACHE_MAX_BYTES."""
+    return _THREAD_RETRIEVERS.stats()
+
+
+def query_cache_stats() -> dict:
+    return _QUERY_CACHE.stats()
 
 
 def thread_document_metadata(thread_id: str) -> dict:
-    return _THREAD_METADATA.get(str(thread_id), {})
\ No newline at end of file
+    key = str(thread_id)
+    if key not in _THREAD_METADATA:
+        metadata = _load_thread_metadata(key)
+        if not metadata:
+            return {}
+        _THREAD_METADATA[key] = metadata
+    return _THREAD_METADATA[key]
\ No newline at end of file
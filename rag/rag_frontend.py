@@ -5,8 +5,11 @@ from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 from rag_backend import (
     chatbot,
-    ingest_pdf,
+    delete_document,
+    ingest_job_status,
+    load_messages,
     retrieve_all_threads,
+    submit_ingest_job,
     thread_document_metadata,
 )
 
@@ -21,6 +24,7 @@ def reset_chat():
     st.session_state["thread_id"] = thread_id
     add_thread(thread_id)
     st.session_state["message_history"] = []
+    st.session_state["history_cursor"] = None
 
 
 def add_thread(thread_id):
@@ -28,15 +32,23 @@ def add_thread(thread_id):
         st.session_state["chat_threads"].append(thread_id)
 
 
-def load_conversation(thread_id):
-    state = chatbot.get_state(config={"configurable": {"thread_id": thread_id}})
-    return state.values.get("messages", [])
+def load_conversation(thread_id, before=None):
+    # One page of the thread, newest last, and the cursor for the page before it
+    messages, cursor = load_messages(thread_id, before=before)
+    temp_messages = []
+    for msg in messages:
+        role = "user" if isinstance(msg, HumanMessage) else "assistant"
+        temp_messages.append({"role": role, "content": msg.content})
+    return temp_messages, cursor
 
 
 # ======================= Session Initialization ===================
 if "message_history" not in st.session_state:
     st.session_state["message_history"] = []
 
+if "history_cursor" not in st.session_state:
+    st.session_state["history_cursor"] = None
+
 if "thread_id" not in st.session_state:
     st.session_state["thread_id"] = generate_thread_id()
 
@@ -46,10 +58,27 @@ if "chat_threads" not in st.session_state:
 if "ingested_docs" not in st.session_state:
     st.session_state["ingested_docs"] = {}
 
+if "ingest_jobs" not in st.session_state:
+    st.session_state["ingest_jobs"] = {}
+
+if "ingest_failures" not in st.session_state:
+    st.session_state["ingest_failures"] = {}
+
+if "uploader_key" not in st.session_state:
+    st.session_state["uploader_key"] = 0
+
 add_thread(st.session_state["thread_id"])
 
 thread_key = str(st.session_state["thread_id"])
-thread_docs = st.session_state["ingested_docs"].setdefault(thread_key, {})
+if thread_key not in st.session_state["ingested_docs"]:
+    # Documents indexed in an earlier session are kept on disk by the backend.
+    st.session_state["ingested_docs"][thread_key] = {
+        doc["filename"]: {**doc, "doc_id": doc_id}
+        for doc_id, doc in thread_document_metadata(thread_key).get("files", {}).items()
+    }
+thread_docs = st.session_state["ingested_docs"][thread_key]
+thread_jobs = st.session_state["ingest_jobs"].setdefault(thread_key, {})
+thread_failures = st.session_state["ingest_failures"].setdefault(thread_key, {})
 threads = st.session_state["chat_threads"][::-1]
 selected_thread = None
 
@@ -62,27 +91,73 @@ if st.sidebar.button("New Chat", use_container_width=True):
     st.rerun()
 
 if thread_docs:
-    latest_doc = list(thread_docs.values())[-1]
-    st.sidebar.success(
-        f"Using `{latest_doc.get('filename')}` "
-        f"({latest_doc.get('chunks')} chunks from {latest_doc.get('documents')} pages)"
-    )
+    for doc_name, doc in list(thread_docs.items()):
+        doc_col, remove_col = st.sidebar.columns([4, 1])
+        doc_col.success(
+            f"Using `{doc_name}` "
+            f"({doc.get('chunks')} chunks from {doc.get('documents')} pages)"
+        )
+        if remove_col.button("✕", key=f"remove-doc-{thread_key}-{doc.get('doc_id')}"):
+            delete_document(thread_key, doc.get("doc_id"))
+            thread_docs.pop(doc_name)
+            # A fresh uploader key drops the file still held by the uploader,
+            # which would otherwise be indexed again on the rerun.
+            st.session_state["uploader_key"] += 1
+            st.rerun()
 else:
     st.sidebar.info("No PDF indexed yet.")
 
-uploaded_pdf = st.sidebar.file_uploader("Upload a PDF for this chat", type=["pdf"])
+uploaded_pdf = st.sidebar.file_uploader(
+    "Upload a PDF for this chat",
+    type=["pdf"],
+    key=f"pdf-uploader-{st.session_state['uploader_key']}",
+)
 if uploaded_pdf:
     if uploaded_pdf.name in thread_docs:
         st.sidebar.info(f"`{uploaded_pdf.name}` already processed for this chat.")
-    else:
-        with st.sidebar.status("Indexing PDF…", expanded=True) as status_box:
-            summary = ingest_pdf(
-                uploaded_pdf.getvalue(),
-                thread_id=thread_key,
-                filename=uploaded_pdf.name,
+    elif uploaded_pdf.name not in thread_jobs:
+        # Indexing runs on the backend's worker pool; the fragment below polls it.
+        thread_failures.pop(uploaded_pdf.name, None)
+        thread_jobs[uploaded_pdf.name] = submit_ingest_job(
+            uploaded_pdf.getvalue(),
+            thread_id=thread_key,
+            filename=uploaded_pdf.name,
+        )
+
+# Failures stay listed until the file is uploaded again or dismissed.
+for doc_name, error in list(thread_failures.items()):
+    error_col, dismiss_col = st.sidebar.columns([4, 1])
+    error_col.error(f"Indexing `{doc_name}` failed: {error}")
+    if dismiss_col.button("✕", key=f"dismiss-failure-{thread_key}-{doc_name}"):
+        thread_failures.pop(doc_name)
+        st.rerun()
+
+
+@st.fragment(run_every=1 if thread_jobs else None)
+def show_ingest_jobs():
+    for doc_name, job_id in list(thread_jobs.items()):
+        job = ingest_job_status(job_id)
+        if job is None or job["status"] == "failed":
+            thread_jobs.pop(doc_name)
+            thread_failures[doc_name] = job and job["error"]
+            # As when removing a document: drop the file from the uploader so
+            # the rerun doesn't submit the same failing job again.
+            st.session_state["uploader_key"] += 1
+            st.rerun()
+        elif job["status"] == "done":
+            thread_jobs.pop(doc_name)
+            thread_docs[doc_name] = job["summary"]
+            # Rerun the whole page so the document shows as ready.
+            st.rerun()
+        else:
+            st.progress(
+                job["progress"],
+                text=f"Indexing `{doc_name}` … {job['chunks_indexed']} chunks",
             )
-            thread_docs[uploaded_pdf.name] = summary
-            status_box.update(label="✅ PDF indexed", state="complete", expanded=False)
+
+
+with st.sidebar:
+    show_ingest_jobs()
 
 st.sidebar.subheader("Past conversations")
 if not threads:
@@ -95,7 +170,15 @@ else:
 # ============================ Main Layout ========================
 st.title("Multi Utility Chatbot")
 
-# Chat area
+# Chat area; older messages are only loaded on request
+if st.session_state["history_cursor"] is not None:
+    if st.button("Load earlier messages"):
+        earlier, st.session_state["history_cursor"] = load_conversation(
+            thread_key, before=st.session_state["history_cursor"]
+        )
+        st.session_state["message_history"] = earlier + st.session_state["message_history"]
+        st.rerun()
+
 for message in st.session_state["message_history"]:
     with st.chat_message(message["role"]):
         st.text(message["content"])
@@ -160,12 +243,7 @@ st.divider()
 
 if selected_thread:
     st.session_state["thread_id"] = selected_thread
-    messages = load_conversation(selected_thread)
-
-    temp_messages = []
-    for msg in messages:
-        role = "user" if isinstance(msg, HumanMessage) else "assistant"
-        temp_messages.append({"role": role, "content": msg.content})
-    st.session_state["message_history"] = temp_messages
-    st.session_state["ingested_docs"].setdefault(str(selected_thread), {})
+    st.session_state["message_history"], st.session_state["history_cursor"] = load_conversation(
+        selected_thread
+    )
     st.rerun()
\ No newline at end of file
@@ -2,10 +2,17 @@ from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from typing import TypedDict
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ChatNode"))
+from llm_cache import response_cache_from_env  # noqa: E402
 
 load_dotenv()
 
-model = ChatOpenAI()
+# Opt-in response cache for reprocessing runs (set LLM_CACHE_PATH)
+llm_cache = response_cache_from_env()
+model = ChatOpenAI(cache=llm_cache)
 
 # Create a state
 class BlogState(TypedDict):
@@ -57,4 +64,7 @@ initial_state = {"title" : "BlackHole"}
 
 final_state = workflow.invoke(initial_state)
 
-print(final_state)
\ No newline at end of file
+print(final_state)
+
+if llm_cache is not None:
+    print(llm_cache.stats())
\ No newline at end of file